@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from api.profiling import profile_call, profile_target
+from foodgram.settings import ASYNC_DB_WORKERS
+
+ASYNC_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'recipes-download-shopping-cart',
+    'recipes-feed',
+    'ingredients-list',
+)
+ASYNC_METHODS = ('GET', 'HEAD')
+
+executor = ThreadPoolExecutor(
+    max_workers=ASYNC_DB_WORKERS,
+    thread_name_prefix='foodgram-db',
+)
+
+
+def run_view(view, request, args, kwargs):
+    """
+    Выполняет синхронное представление в потоке пула, как отдельный
+    запрос: со своими соединениями с БД и готовым телом ответа
+    (потоковое тело тоже читается здесь, пока соединение открыто).
+    """
+    close_old_connections()
+    try:
+        name = profile_target()
+        if name is not None:
+            response = profile_call(name, view, request, *args, **kwargs)
+        else:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+        if response.streaming:
+            response.streaming_content = list(response.streaming_content)
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """
+    Асинхронная обёртка над представлением DRF: цикл событий не ждёт
+    БД, а запросы выполняются в ограниченном пуле потоков. В пул идут
+    только GET и HEAD, остальные методы выполняются как обычное
+    синхронное представление.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ASYNC_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_event_loop().run_in_executor(
+            executor, context.run, run_view, view, request, args, kwargs)
+    return wrapper
+
+
+def asyncify(urlpatterns, names=ASYNC_ROUTES):
+    """Подменяет представления маршрутов с именами names асинхронными."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from foodgram.settings import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+from users.models import CustomUser
+
+STATE_KEY = 'token_state:{}'
+VALID, REVOKED = 'valid', 'revoked'
+
+
+class TokenCache:
+    """
+    Ограниченный LRU-кэш токен -> id пользователя в памяти процесса.
+    Записи живут TOKEN_CACHE_TTL секунд и действуют, только пока в общем
+    кэше есть отметка о том, что токен действителен: отметку, вытесненную
+    из кэша, заменяет проверка в БД, а не доверие устаревшей записи.
+    """
+
+    def __init__(self, size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_at, user_id = entry
+            if time.time() - cached_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        state = caches['reference'].get(STATE_KEY.format(key))
+        if state is None or state[0] != VALID:
+            self.evict(key)
+            return None
+        return user_id
+
+    def set(self, key, user_id, checked_at):
+        """
+        Запоминает токен, проверенный в БД в момент checked_at,
+        если с тех пор его не отозвали.
+        """
+        state = caches['reference'].get(STATE_KEY.format(key))
+        if state is not None and state[0] == REVOKED \
+                and state[1] >= checked_at:
+            return
+        caches['reference'].set(
+            STATE_KEY.format(key), (VALID, checked_at), self.ttl)
+        with self._lock:
+            self._entries[key] = (time.time(), user_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def evict(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def revoke(self, key):
+        """Удаляет токен из кэша этого и всех остальных процессов."""
+        self.evict(key)
+        caches['reference'].set(
+            STATE_KEY.format(key), (REVOKED, time.time()), self.ttl)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который не ходит в БД за известным токеном.
+    Кэшируется только id пользователя: сам пользователь загружается
+    из БД при первом обращении к его полям.
+    """
+
+    def authenticate_credentials(self, key):
+        user_id = token_cache.get(key)
+        if user_id is None:
+            checked_at = time.time()
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user.id, checked_at)
+            return user, token
+        return LazyUser(user_id), Token(key=key, user_id=user_id)
+
+
+def load_active_user(user_id):
+    """
+    Пользователь по id; удалённый или неактивный — ошибка
+    аутентификации, как в get_user из simplejwt.
+    """
+    try:
+        user = CustomUser.objects.get(pk=user_id)
+    except CustomUser.DoesNotExist:
+        raise AuthenticationFailed(
+            _('User not found'), code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed(
+            _('User is inactive'), code='user_inactive')
+    return user
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    Пользователь по id из кэша токенов или из JWT: остальные поля
+    загружаются из БД только при первом обращении к ним.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        super().__init__(lambda: load_active_user(user_id))
+        self.__dict__['id'] = self.__dict__['pk'] = user_id
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT без запроса к БД: подпись и срок проверяются локально,
+    пользователь загружается, только если view нужны его поля.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        return LazyUser(user_id)
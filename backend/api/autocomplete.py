@@ -0,0 +1,76 @@
+from bisect import bisect_left
+from operator import itemgetter
+from threading import Lock
+
+from api.reference import get_reference_data
+from foodgram.settings import INGREDIENTS_SEARCH_LIMIT
+
+
+def normalize(value):
+    """Приводит строку к виду для сравнения: регистр и ё/е."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Строится из снимка справочников и перестраивается при смене его
+    версии, совпадения по префиксу идут раньше вхождений.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def build(self, snapshot):
+        """Строит отсортированный индекс по снимку справочников."""
+        rows = sorted(
+            (
+                (normalize(ingredient.name), {
+                    'id': ingredient.id,
+                    'name': ingredient.name,
+                    'measurement_unit': ingredient.measurement_unit,
+                })
+                for ingredient in snapshot.ingredients
+            ),
+            key=itemgetter(0)
+        )
+        keys = [key for key, item in rows]
+        items = [item for key, item in rows]
+        return snapshot.version, keys, items
+
+    def _get(self):
+        snapshot = get_reference_data()
+        index = self._index
+        if index is not None and index[0] == snapshot.version:
+            return index[1:]
+        with self._lock:
+            if self._index is None or self._index[0] != snapshot.version:
+                self._index = self.build(snapshot)
+            return self._index[1:]
+
+    def all(self):
+        """Все ингредиенты в порядке названий."""
+        return self._get()[1]
+
+    def search(self, query, limit=INGREDIENTS_SEARCH_LIMIT):
+        """Ингредиенты по префиксу, затем по вхождению подстроки."""
+        keys, items = self._get()
+        query = normalize(query.strip())
+        if not query:
+            return items[:limit]
+        result = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(items[position])
+            position += 1
+        for key, item in zip(keys, items):
+            if len(result) >= limit:
+                break
+            if query in key and not key.startswith(query):
+                result.append(item)
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,98 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from food.models import Recipe
+from users.models import CustomUser
+
+
+def count_subquery(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешний объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Recipe.is_favorited.through, 'recipe'),
+    (Recipe, 'shopping_cart_count',
+     Recipe.is_in_shopping_cart.through, 'recipe'),
+    (CustomUser, 'recipes_count', Recipe, 'author'),
+    (CustomUser, 'subscribers_count',
+     CustomUser.is_subscribed.through, 'to_customuser'),
+)
+
+M2M_COUNTERS = {
+    Recipe.is_favorited.through: (
+        Recipe, 'favorites_count', 'recipe', 'customuser', True),
+    Recipe.is_in_shopping_cart.through: (
+        Recipe, 'shopping_cart_count', 'recipe', 'customuser', True),
+    CustomUser.is_subscribed.through: (
+        CustomUser, 'subscribers_count', 'to_customuser', 'from_customuser',
+        False),
+}
+
+
+def change_counter(model, field, ids, delta):
+    """Атомарно изменяет счётчик у объектов с указанными id."""
+    if delta:
+        model.objects.filter(pk__in=ids).update(**{field: F(field) + delta})
+
+
+def change_m2m_counter(through, instance, reverse, pk_set, delta):
+    """
+    Изменяет счётчик после изменения связи многие-ко-многим.
+    Счётчик хранится у рецепта или у автора, на которого подписываются,
+    это либо instance, либо объекты из pk_set.
+    """
+    model, field, counted, other, forward_counted = M2M_COUNTERS[through]
+    if reverse != forward_counted:
+        change_counter(model, field, (instance.pk,), delta * len(pk_set))
+    else:
+        change_counter(model, field, pk_set, delta)
+
+
+def clear_m2m_counter(through, instance, reverse):
+    """Уменьшает счётчики перед очисткой связи многие-ко-многим."""
+    model, field, counted, other, forward_counted = M2M_COUNTERS[through]
+    if reverse != forward_counted:
+        change_counter(model, field, (instance.pk,), -through.objects.filter(
+            **{counted: instance}).count())
+    else:
+        change_counter(model, field, through.objects.filter(
+            **{other: instance}).values(counted), -1)
+
+
+def keep_existing_links(through, instance, reverse, pk_set):
+    """
+    Оставляет в pk_set перед удалением только существующие связи:
+    remove() передаёт сигналам все переданные id, а не удалённые.
+    """
+    model, field, counted, other, forward_counted = M2M_COUNTERS[through]
+    source, target = (counted, other) if forward_counted else (other, counted)
+    if reverse:
+        source, target = target, source
+    pk_set.intersection_update(through.objects.filter(**{
+        source: instance.pk, f'{target}__in': pk_set
+    }).values_list(target, flat=True))
+
+
+def recount(fix=True):
+    """
+    Пересчитывает счётчики, возвращает число расхождений по каждому
+    и при fix=True исправляет их.
+    """
+    drifted = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = count_subquery(related_model, related_field)
+        wrong = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')})
+        drifted[field] = wrong.count()
+        if fix and drifted[field]:
+            model.objects.filter(
+                pk__in=wrong.values('pk')
+            ).update(**{field: actual})
+    return drifted
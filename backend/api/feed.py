@@ -0,0 +1,103 @@
+from heapq import merge
+
+from food.models import FeedEntry, Recipe
+from foodgram.settings import FEED_BACKFILL_SIZE, FEED_FANOUT_MAX_FOLLOWERS
+from users.models import CustomUser
+
+Subscription = CustomUser.is_subscribed.through
+
+
+def pushed_authors(author_ids):
+    """Авторы, чьи рецепты раскладываются по лентам при публикации."""
+    return CustomUser.objects.filter(
+        id__in=author_ids,
+        subscribers_count__lte=FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('id', flat=True)
+
+
+def fan_out(recipe):
+    """
+    Раскладывает новый рецепт по лентам подписчиков автора.
+    Рецепты популярных авторов читаются из ленты напрямую (pull);
+    число подписчиков берётся из БД тем же запросом, а не из
+    возможно устаревшего recipe.author.
+    """
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe=recipe,
+                      pub_date=recipe.pub_date)
+            for user_id in Subscription.objects.filter(
+                to_customuser=recipe.author_id,
+                to_customuser__subscribers_count__lte=(
+                    FEED_FANOUT_MAX_FOLLOWERS),
+            ).values_list('from_customuser', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+
+
+def subscribed(user_id, author_ids):
+    """Заполняет ленту последними рецептами новых авторов."""
+    entries = []
+    for author_id in pushed_authors(author_ids):
+        entries.extend(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      pub_date=pub_date)
+            for recipe_id, pub_date in Recipe.objects.filter(
+                author=author_id
+            ).order_by('-pub_date').values_list(
+                'id', 'pub_date')[:FEED_BACKFILL_SIZE]
+        )
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def unsubscribed(user_id, author_ids):
+    """Убирает из ленты рецепты авторов, от которых отписались."""
+    FeedEntry.objects.filter(
+        user=user_id, recipe__author__in=author_ids).delete()
+
+
+def rebuild_feeds():
+    """Заново раскладывает последние рецепты авторов по лентам."""
+    FeedEntry.objects.all().delete()
+    authors = CustomUser.objects.filter(
+        subscribers_count__gt=0,
+        subscribers_count__lte=FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('id', flat=True)
+    for author_id in list(authors):
+        recipes = list(Recipe.objects.filter(author=author_id).order_by(
+            '-pub_date').values_list('id', 'pub_date')[:FEED_BACKFILL_SIZE])
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                          pub_date=pub_date)
+                for user_id in Subscription.objects.filter(
+                    to_customuser=author_id
+                ).values_list('from_customuser', flat=True)
+                for recipe_id, pub_date in recipes
+            ),
+            batch_size=1000,
+        )
+
+
+def feed_keys(user, keyset, cursor, limit):
+    """
+    Ключи (pub_date, id) страницы ленты: диапазон по индексу записей
+    ленты плюс рецепты популярных авторов, слитые в общем порядке.
+    """
+    entries = keyset(
+        FeedEntry.objects.filter(user=user), cursor, 'pub_date', 'recipe'
+    ).values_list('pub_date', 'recipe')[:limit]
+    pulled = keyset(
+        Recipe.objects.filter(author__in=Subscription.objects.filter(
+            from_customuser=user.id,
+            to_customuser__subscribers_count__gt=FEED_FANOUT_MAX_FOLLOWERS,
+        ).values('to_customuser')),
+        cursor, 'pub_date', 'id'
+    ).values_list('pub_date', 'id')[:limit]
+    reverse = cursor is None or not cursor[0]
+    keys = []
+    for key in merge(entries, pulled, reverse=reverse):
+        if not keys or keys[-1] != key:
+            keys.append(key)
+    return keys[:limit]
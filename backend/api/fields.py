@@ -1,27 +1,123 @@
-from django.core.files.uploadedfile import SimpleUploadedFile
-from rest_framework import serializers
-
 import base64
-import uuid
+import binascii
 import tempfile
+import uuid
+
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from api.reference import get_reference_data, get_reference_objects
+from foodgram.settings import (FILE_UPLOAD_MAX_MEMORY_SIZE,
+                               RECIPE_IMAGE_MAX_SIZE)
+
+BASE64_PREFIX = 'data:image/'
+BASE64_MARKER = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
 
 
 class Base64ImageField(serializers.ImageField):
-    """drf-extra-fields.fields, Конвертирует картинку в base64."""
+    """
+    drf-extra-fields.fields, Конвертирует картинку в base64.
+    Принимает также обычный файл из multipart-запроса.
+    """
+
+    default_error_messages = {
+        'base64': 'Некорректная картинка в base64.',
+        'max_size': 'Размер картинки не должен превышать {max_size} байт.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=RECIPE_IMAGE_MAX_SIZE)
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        """
+        Декодирует base64 частями прямо в SpooledTemporaryFile,
+        слишком большие картинки отклоняет до декодирования.
+        """
+        header, marker, payload = data.partition(BASE64_MARKER)
+        if not marker or not header.startswith(BASE64_PREFIX):
+            self.fail('base64')
+        content_type = header[len(BASE64_PREFIX):]
+        if not content_type.isalnum():
+            self.fail('base64')
+        if len(payload) // 4 * 3 > RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=RECIPE_IMAGE_MAX_SIZE)
+        image = tempfile.SpooledTemporaryFile(
+            max_size=FILE_UPLOAD_MAX_MEMORY_SIZE)
+        try:
+            for start in range(0, len(payload), BASE64_CHUNK_SIZE):
+                image.write(base64.b64decode(
+                    payload[start:start + BASE64_CHUNK_SIZE], validate=True))
+        except (binascii.Error, ValueError):
+            image.close()
+            self.fail('base64')
+        size = image.tell()
+        image.seek(0)
+        return UploadedFile(
+            file=image,
+            name=f'{uuid.uuid4().hex}.{content_type}',
+            content_type=f'image/{content_type}',
+            size=size,
+        )
+
+
+class ReferenceManyRelatedField(ManyRelatedField):
+    """Проверяет все id разом и сообщает обо всех несуществующих."""
+
+    default_error_messages = {
+        'does_not_exist': 'Объектов с id {pk_values} не существует.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        objects, missing = get_reference_objects(
+            self.child_relation.index,
+            [self.child_relation.to_pk(item) for item in data]
+        )
+        if missing:
+            self.fail(
+                'does_not_exist', pk_values=', '.join(map(str, missing)))
+        return objects
+
+
+class ReferencePrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который ищет объект в снимке справочников
+    вместо запроса к БД.
+    """
+
+    def __init__(self, index, **kwargs):
+        self.index = index
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ReferenceManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        """Приводит входное значение к целому id."""
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
     def to_internal_value(self, data):
-        data = data.strip('data:image/')
-        index = data.find(';')
-        content_type = data[:index]
-        data = data[index + 8:]
-        image_data = base64.b64decode(data)
-        filename = uuid.uuid4().hex
-        with tempfile.TemporaryFile() as image:
-            image.write(image_data)
-            image.seek(0)
-            file = SimpleUploadedFile(
-                name=f'{filename}.{content_type}',
-                content=image.read(),
-                content_type=f'image/{content_type}'
-            )
-        return super().to_internal_value(file)
+        pk = self.to_pk(data)
+        obj = getattr(get_reference_data(), self.index).get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
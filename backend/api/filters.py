@@ -1,25 +1,32 @@
 from django_filters import rest_framework
 
-from food.models import Ingredients, Recipe, Tag
+from api.recipe_index import recipe_index
+from api.reference import get_reference_data
+from api.search import search_recipes
+from food.models import Recipe
 from users.models import CustomUser
 
 
-class IngredientsFilter(rest_framework.FilterSet):
-    name = rest_framework.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
+def tag_choices():
+    """Слаги тэгов из снимка справочников."""
+    return [(slug, slug) for slug in get_reference_data().tags_by_slug]
 
-    class Meta:
-        model = Ingredients
-        fields = ('name', )
+
+class NumberInFilter(rest_framework.BaseInFilter, rest_framework.NumberFilter):
+    pass
 
 
 class RecipesFilter(rest_framework.FilterSet):
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    search = rest_framework.CharFilter(method='filter_search')
+    ingredients = NumberInFilter()
+    exclude_ingredients = NumberInFilter()
+    ingredients_min_share = rest_framework.NumberFilter(
+        min_value=0,
+        max_value=1,
+    )
+    tags = rest_framework.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
     author = rest_framework.ModelMultipleChoiceFilter(
         field_name='author__id',
@@ -29,4 +36,47 @@ class RecipesFilter(rest_framework.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', )
+        fields = (
+            'author',
+            'tags',
+            'search',
+            'ingredients',
+            'exclude_ingredients',
+            'ingredients_min_share',
+        )
+
+    def filter_queryset(self, queryset):
+        """
+        Ингредиенты фильтруются по обратному индексу в памяти:
+        ?ingredients= все перечисленные есть в рецепте, а с
+        ?ingredients_min_share= перечисленные покрывают не меньше
+        этой доли ингредиентов рецепта; ?exclude_ingredients= исключает.
+        """
+        cleaned_data = self.form.cleaned_data
+        include = [int(pk) for pk in cleaned_data.pop('ingredients') or ()]
+        exclude = [
+            int(pk) for pk in cleaned_data.pop('exclude_ingredients') or ()]
+        min_share = cleaned_data.pop('ingredients_min_share')
+        queryset = super().filter_queryset(queryset)
+        if include:
+            queryset = queryset.filter(id__in=recipe_index.match(
+                include, exclude, min_share))
+        elif exclude:
+            queryset = queryset.exclude(
+                id__in=recipe_index.containing_any(exclude))
+        return queryset
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтрует по id тэгов без соединения с таблицей тэгов."""
+        if not value:
+            return queryset
+        tags_by_slug = get_reference_data().tags_by_slug
+        return queryset.filter(
+            tags__in=[tags_by_slug[slug].id for slug in value]
+        ).distinct()
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта."""
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
@@ -0,0 +1,253 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from hmac import compare_digest
+from threading import Lock
+
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.deprecation import MiddlewareMixin
+
+from foodgram.settings import (METRICS_ALLOWED_IPS, METRICS_BUCKETS,
+                               METRICS_FLUSH_INTERVAL, METRICS_TOKEN,
+                               METRICS_WORKER_TTL)
+
+WORKERS_KEY = 'metrics:workers'
+UNMATCHED = '<unmatched>'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Запросы к БД и их время в рамках одного HTTP-запроса."""
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper: считает запросы текущего HTTP-запроса."""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_counter(connection, **kwargs):
+    """Подключает счётчик запросов к каждому новому соединению."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+for connection in connections.all():
+    install_query_counter(connection)
+
+
+class Registry:
+    """
+    Метрики маршрутов в памяти процесса. Снимок периодически
+    сохраняется в общий кэш, чтобы /metrics отдавал все воркеры.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.routes = {}
+        self.flushed = 0.0
+
+    def route(self, name):
+        stats = self.routes.get(name)
+        if stats is None:
+            stats = self.routes.setdefault(name, {
+                'buckets': [0] * (len(METRICS_BUCKETS) + 1),
+                'count': 0,
+                'seconds': 0.0,
+                'queries': 0,
+                'db_seconds': 0.0,
+                'bytes': 0,
+            })
+        return stats
+
+    def observe(self, name, seconds, request_stats, size):
+        with self.lock:
+            stats = self.route(name)
+            stats['buckets'][bisect_left(METRICS_BUCKETS, seconds)] += 1
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['queries'] += request_stats.queries
+            stats['db_seconds'] += request_stats.db_time
+            stats['bytes'] += size
+        if time.monotonic() - self.flushed > METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def add_bytes(self, name, size):
+        with self.lock:
+            self.route(name)['bytes'] += size
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: dict(stats, buckets=list(stats['buckets']))
+                for name, stats in self.routes.items()
+            }
+
+    def flush(self):
+        """Сохраняет снимок воркера в общий кэш."""
+        self.flushed = time.monotonic()
+        cache = caches['reference']
+        pid = os.getpid()
+        cache.set(f'metrics:{pid}', self.snapshot(), METRICS_WORKER_TTL)
+        workers = cache.get(WORKERS_KEY) or set()
+        if pid not in workers:
+            cache.set(WORKERS_KEY, workers | {pid}, None)
+
+    def collect(self):
+        """Снимки всех живых воркеров {pid: {маршрут: метрики}}."""
+        self.flush()
+        cache = caches['reference']
+        workers = cache.get(WORKERS_KEY) or set()
+        snapshots = cache.get_many([f'metrics:{pid}' for pid in workers])
+        alive = {
+            int(key.partition(':')[2]): snapshot
+            for key, snapshot in snapshots.items()
+        }
+        if alive.keys() != workers:
+            cache.set(WORKERS_KEY, set(alive), None)
+        return alive
+
+
+registry = Registry()
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.url_name or match.view_name
+
+
+def counted(content, name):
+    """Отдаёт потоковый ответ, досчитывая его размер по окончании."""
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        registry.add_bytes(name, size)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Время ответа, число и время запросов к БД и размер ответа
+    по именованным маршрутам DRF.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = _request_stats.set(RequestStats())
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self.observe(request, response, started)
+        finally:
+            _request_stats.reset(token)
+
+    async def __acall__(self, request):
+        token = _request_stats.set(RequestStats())
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self.observe(request, response, started)
+        finally:
+            _request_stats.reset(token)
+
+    def observe(self, request, response, started):
+        name = route_name(request)
+        if response.streaming:
+            response.streaming_content = counted(
+                response.streaming_content, name)
+            size = 0
+        else:
+            size = len(response.content)
+        registry.observe(
+            name,
+            time.perf_counter() - started,
+            _request_stats.get(),
+            size
+        )
+        return response
+
+
+def render(workers):
+    """Метрики в текстовом формате Prometheus."""
+    bounds = [str(bound) for bound in METRICS_BUCKETS] + ['+Inf']
+    lines = [
+        '# HELP foodgram_request_duration_seconds Request wall time.',
+        '# TYPE foodgram_request_duration_seconds histogram',
+    ]
+    rows = [
+        (f'route="{name}",worker="{pid}"', stats)
+        for pid, routes in sorted(workers.items())
+        for name, stats in sorted(routes.items())
+    ]
+    for labels, stats in rows:
+        total = 0
+        for bound, count in zip(bounds, stats['buckets']):
+            total += count
+            lines.append(
+                'foodgram_request_duration_seconds_bucket'
+                f'{{{labels},le="{bound}"}} {total}'
+            )
+        lines.append(
+            f'foodgram_request_duration_seconds_sum{{{labels}}} '
+            f'{stats["seconds"]}'
+        )
+        lines.append(
+            f'foodgram_request_duration_seconds_count{{{labels}}} '
+            f'{stats["count"]}'
+        )
+    for metric, key, help_text in (
+        ('foodgram_db_queries_total', 'queries', 'Database queries.'),
+        ('foodgram_db_duration_seconds_total', 'db_seconds',
+         'Time spent in database queries.'),
+        ('foodgram_response_bytes_total', 'bytes', 'Response body size.'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        lines.extend(
+            f'{metric}{{{labels}}} {stats[key]}' for labels, stats in rows)
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    """
+    Метрики отдаются адресам из METRICS_ALLOWED_IPS
+    или по заголовку Authorization: Bearer <METRICS_TOKEN>.
+    """
+    if request.META.get('REMOTE_ADDR') in METRICS_ALLOWED_IPS:
+        return True
+    return bool(METRICS_TOKEN) and compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        f'Bearer {METRICS_TOKEN}'.encode())
+
+
+def metrics(request):
+    """Метрики всех воркеров для Prometheus."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import random
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.deprecation import MiddlewareMixin
+
+from api import metrics
+from api.metrics import route_name
+from foodgram.settings import (BASE_DIR, NPLUSONE_SAMPLE_RATE,
+                               NPLUSONE_STACK_DEPTH, NPLUSONE_STRICT,
+                               NPLUSONE_THRESHOLD, QUERY_BUDGETS)
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_FILES = {__file__, metrics.__file__}
+PARAMS_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+_request_queries = ContextVar('request_queries', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт превысил бюджет запросов или выполнил N+1 в строгом режиме."""
+
+
+class RequestQueries:
+    """Шаблоны SQL одного HTTP-запроса и стеки повторяющихся."""
+    __slots__ = ('templates', 'stacks', 'total')
+
+    def __init__(self):
+        self.templates = Counter()
+        self.stacks = {}
+        self.total = 0
+
+
+def project_stack():
+    """Кадры стека из кода проекта, ближайшие к запросу."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(BASE_DIR)
+        and 'site-packages' not in frame.filename
+        and frame.filename not in SKIPPED_FILES
+    ]
+    return [
+        f'{frame.filename[len(BASE_DIR) + 1:]}:{frame.lineno} '
+        f'in {frame.name}'
+        for frame in frames[-NPLUSONE_STACK_DEPTH:]
+    ]
+
+
+def detect_repeats(execute, sql, params, many, context):
+    """execute_wrapper: считает одинаковые шаблоны SQL в запросе."""
+    queries = _request_queries.get()
+    if queries is not None:
+        template = PARAMS_LIST.sub('%s', sql)
+        queries.total += 1
+        queries.templates[template] += 1
+        if (queries.templates[template] == NPLUSONE_THRESHOLD
+                and template not in queries.stacks):
+            queries.stacks[template] = project_stack()
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Запросы внутри блока не считаются в бюджет маршрута: так помечаются
+    разовые прогревы кэшей процесса, а не постоянная цена эндпоинта.
+    """
+    token = _request_queries.set(None)
+    try:
+        yield
+    finally:
+        _request_queries.reset(token)
+
+
+@receiver(connection_created)
+def install_detector(connection, **kwargs):
+    """Подключает детектор к каждому новому соединению."""
+    if detect_repeats not in connection.execute_wrappers:
+        connection.execute_wrappers.append(detect_repeats)
+
+
+def report(route, queries):
+    """Краткий отчёт о повторяющихся запросах."""
+    lines = [f'N+1 in {route}: {queries.total} queries']
+    for template, stack in queries.stacks.items():
+        lines.append(
+            f'  {queries.templates[template]}x {template[:200]}')
+        lines.extend(f'    at {frame}' for frame in stack)
+    return '\n'.join(lines)
+
+
+class NPlusOneMiddleware(MiddlewareMixin):
+    """
+    Выборочно (NPLUSONE_SAMPLE_RATE) ищет повторяющиеся запросы к БД
+    и пишет их в лог вместе со стеком. В строгом режиме проверяется
+    каждый запрос, а N+1 или превышение QUERY_BUDGETS — ошибка.
+    """
+
+    def __init__(self, get_response):
+        if not NPLUSONE_STRICT and NPLUSONE_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        for connection in connections.all():
+            install_detector(connection)
+        super().__init__(get_response)
+
+    def sampled(self):
+        return NPLUSONE_STRICT or random.random() < NPLUSONE_SAMPLE_RATE
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        queries = RequestQueries()
+        token = _request_queries.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.check(request, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        queries = RequestQueries()
+        token = _request_queries.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.check(request, queries)
+        return response
+
+    def check(self, request, queries):
+        route = f'{request.method} {route_name(request)}'
+        if queries.stacks:
+            message = report(route, queries)
+            logger.warning(message)
+            if NPLUSONE_STRICT:
+                raise QueryBudgetExceeded(message)
+        budget = QUERY_BUDGETS.get(route)
+        if NPLUSONE_STRICT and budget is not None and (
+                queries.total > budget):
+            raise QueryBudgetExceeded(
+                f'{route}: {queries.total} queries, budget {budget}')
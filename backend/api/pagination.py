@@ -1,7 +1,213 @@
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from api.feed import feed_keys
 from foodgram.settings import PAGE_SIZE
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PreparedPaginator(Paginator):
+    """Считает записи по исходному набору, а срез страницы готовит prepare."""
+
+    def __init__(self, object_list, per_page, prepare, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.prepare = prepare
+
+    def _get_page(self, object_list, number, paginator):
+        return super()._get_page(self.prepare(object_list), number, paginator)
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Постраничная пагинация, с ?count=false обходится без COUNT(*):
+    читает на одну запись больше, чтобы узнать о следующей странице.
+    Подзапросы для полей страницы (view.prepare_page) добавляются
+    только к срезу страницы и не попадают в COUNT(*).
+    """
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    @property
+    def django_paginator_class(self):
+        return partial(PreparedPaginator, prepare=self.prepare)
+
+    def prepare(self, queryset):
+        prepare_page = getattr(self.view, 'prepare_page', None)
+        if prepare_page is None:
+            return queryset
+        return prepare_page(queryset)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.with_count = request.query_params.get(
+            self.count_query_param) not in ('0', 'false')
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = max(
+                int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            self.page_number = 1
+        offset = (self.page_number - 1) * page_size
+        rows = list(self.prepare(queryset[offset:offset + page_size + 1]))
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1,
+        )
+
+    def get_previous_link(self):
+        if self.with_count:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+def keyset(queryset, cursor, date_field='pub_date', id_field='id'):
+    """
+    Упорядочивает по (date_field, id_field) от новых к старым и отсекает
+    записи до курсора; для курсора назад порядок обратный.
+    """
+    order = (f'-{date_field}', f'-{id_field}')
+    if cursor is None:
+        return queryset.order_by(*order)
+    reverse, pub_date, pk = cursor
+    lookup = 'gt' if reverse else 'lt'
+    queryset = queryset.filter(
+        Q(**{f'{date_field}__{lookup}': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk})
+    )
+    if reverse:
+        return queryset.order_by(date_field, id_field)
+    return queryset.order_by(*order)
+
+
+class RecipePagination(CustomPagination):
+    """
+    Для ленты рецептов при наличии ?cursor= включает пагинацию по ключу
+    (pub_date, id): без COUNT(*) и OFFSET, скорость не зависит от глубины.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def use_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.view = view
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param))
+        rows = self.fetch(queryset, cursor, page_size + 1)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if cursor is not None and cursor[0]:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.rows = rows
+        return rows
+
+    def fetch(self, queryset, cursor, limit):
+        """Записи после курсора, для курсора назад — в обратном порядке."""
+        return list(self.prepare(keyset(queryset, cursor)[:limit]))
+
+    def decode_cursor(self, value):
+        """Курсор вида [r|n]|pub_date|id в base64."""
+        if not value:
+            return None
+        try:
+            direction, pub_date, pk = base64.urlsafe_b64decode(
+                value.encode()).decode().split('|')
+            return direction == 'r', datetime.fromisoformat(pub_date), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, recipe):
+        position = '|'.join((
+            'r' if reverse else 'n',
+            recipe.pub_date.isoformat(),
+            str(recipe.id),
+        ))
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(position.encode()).decode(),
+        )
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(False, self.rows[-1])
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_cursor(True, self.rows[0])
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class FeedPagination(RecipePagination):
+    """
+    Лента подписок всегда листается по курсору: страница — диапазон
+    записей ленты по индексу, рецепты дочитываются по id.
+    """
+
+    def use_cursor(self, request):
+        return True
+
+    def fetch(self, queryset, cursor, limit):
+        keys = feed_keys(self.request.user, keyset, cursor, limit)
+        recipes = self.prepare(queryset).in_bulk(pk for _, pk in keys)
+        return [recipes[pk] for _, pk in keys if pk in recipes]
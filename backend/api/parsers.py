@@ -0,0 +1,19 @@
+import uuid
+
+from rest_framework.parsers import FileUploadParser
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Картинка телом запроса. Без Content-Disposition с именем файла
+    имя берётся случайное, а расширение — из Content-Type.
+    """
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        subtype = (media_type or '').partition(';')[0].partition('/')[2]
+        if not subtype.strip().isalnum():
+            subtype = 'jpg'
+        return f'{uuid.uuid4().hex}.{subtype.strip().lower()}'
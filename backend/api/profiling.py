@@ -0,0 +1,200 @@
+import asyncio
+import cProfile
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+from foodgram.settings import (PROFILE_DIR, PROFILE_SAMPLE_EVERY,
+                               PROFILE_SAMPLER_INTERVAL,
+                               PROFILE_TOKEN_MAX_AGE,
+                               PROFILE_TOP_ALLOCATIONS)
+from users.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SALT = 'foodgram.profile'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+
+_profile_target = ContextVar('profile_target', default=None)
+_tracing_lock = threading.Lock()
+_tracing = 0
+_sequence = itertools.count(1)
+
+
+def make_token(user):
+    """Подписанный токен, включающий профилирование для сотрудника."""
+    return signing.dumps({'user': user.pk}, salt=PROFILE_SALT)
+
+
+def token_user(token):
+    """id сотрудника из действующего токена или None."""
+    try:
+        data = signing.loads(
+            token, salt=PROFILE_SALT, max_age=PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if CustomUser.objects.filter(pk=data['user'], is_staff=True).exists():
+        return data['user']
+    return None
+
+
+def profile_target():
+    """Имя маршрута, если текущий запрос нужно профилировать."""
+    return _profile_target.get()
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока запроса с заданным интервалом."""
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(PROFILE_SAMPLER_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({os.path.basename(code.co_filename)}:'
+                    f'{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def start_tracing():
+    global _tracing
+    with _tracing_lock:
+        if not _tracing and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracing += 1
+    return tracemalloc.take_snapshot()
+
+
+def stop_tracing():
+    global _tracing
+    snapshot = tracemalloc.take_snapshot()
+    with _tracing_lock:
+        _tracing -= 1
+        if not _tracing:
+            tracemalloc.stop()
+    return snapshot
+
+
+def profile_call(name, func, *args, **kwargs):
+    """
+    Выполняет func под cProfile, tracemalloc и сэмплером стеков
+    и сохраняет в PROFILE_DIR: .prof для pstats/snakeviz,
+    .collapsed для flamegraph.pl/speedscope и .alloc.txt.
+    """
+    before = start_tracing()
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+        if callable(getattr(result, 'render', None)):
+            result.render()
+        return result
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        own = (tracemalloc.Filter(False, __file__),
+               tracemalloc.Filter(False, tracemalloc.__file__))
+        after = stop_tracing().filter_traces(own)
+        save_profile(name, elapsed, profiler, sampler.stacks,
+                     after.compare_to(before.filter_traces(own), 'lineno'))
+
+
+def save_profile(name, elapsed, profiler, stacks, allocations):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, '{}-{}-{}-{}'.format(
+        time.strftime('%Y%m%d-%H%M%S'), name, os.getpid(), next(_sequence)))
+    profiler.dump_stats(f'{base}.prof')
+    with open(f'{base}.collapsed', 'w') as file:
+        for stack, count in stacks.most_common():
+            file.write(f'{stack} {count}\n')
+    with open(f'{base}.alloc.txt', 'w') as file:
+        file.write(f'{name}: {elapsed * 1000:.1f} ms\n')
+        for stat in allocations[:PROFILE_TOP_ALLOCATIONS]:
+            file.write(f'{stat}\n')
+    logger.info('Profile of %s (%.1f ms) saved to %s.*',
+                name, elapsed * 1000, base)
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Профилирует запрос с подписанным токеном сотрудника в заголовке
+    X-Profile или параметре ?profile=, а при PROFILE_SAMPLE_EVERY = N
+    ещё и каждый N-й запрос каждого маршрута. В режиме ASGI
+    профилируются асинхронные маршруты (api.async_views).
+    """
+
+    def __init__(self, get_response):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        super().__init__(get_response)
+
+    def token(self, request):
+        return (request.headers.get(PROFILE_HEADER)
+                or request.GET.get(PROFILE_PARAM))
+
+    def target(self, request):
+        token = self.token(request)
+        if not token and PROFILE_SAMPLE_EVERY <= 0:
+            return None
+        try:
+            name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        if token:
+            return name if token_user(token) is not None else None
+        with self.lock:
+            self.counters[name] += 1
+            sampled = self.counters[name] % PROFILE_SAMPLE_EVERY == 0
+        return name if sampled else None
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        name = self.target(request)
+        if name is None:
+            return self.get_response(request)
+        return profile_call(name, self.get_response, request)
+
+    async def __acall__(self, request):
+        if not self.token(request) and PROFILE_SAMPLE_EVERY <= 0:
+            return await self.get_response(request)
+        name = await sync_to_async(self.target)(request)
+        if name is None:
+            return await self.get_response(request)
+        token = _profile_target.set(name)
+        try:
+            return await self.get_response(request)
+        finally:
+            _profile_target.reset(token)
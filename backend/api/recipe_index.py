@@ -0,0 +1,181 @@
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+from threading import Lock
+
+from django.db import connection
+from django.db.models import DateTimeField, Value
+
+from food.models import Recipe, RecipeIngredients
+
+# Изменения, закоммиченные позже своего updated_at, догоняются
+# повторным чтением рецептов, изменённых за этот интервал
+# до прошлого обращения.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def database_now():
+    """Текущее время по часам БД."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT CURRENT_TIMESTAMP')
+        value = cursor.fetchone()[0]
+    expression = Value(None, output_field=DateTimeField())
+    for converter in connection.ops.get_db_converters(expression):
+        value = converter(value, expression, connection)
+    return value
+
+
+def contains(posting, value):
+    """Есть ли value в отсортированном массиве."""
+    position = bisect_left(posting, value)
+    return position < len(posting) and posting[position] == value
+
+
+def intersect(shorter, longer):
+    """Пересечение отсортированных массивов поиском по длинному."""
+    result = array('I')
+    low = 0
+    for value in shorter:
+        low = bisect_left(longer, value, low)
+        if low == len(longer):
+            break
+        if longer[low] == value:
+            result.append(value)
+    return result
+
+
+def union(postings):
+    """Объединение отсортированных массивов слиянием, без повторов."""
+    result = array('I')
+    for value in heapq.merge(*postings):
+        if not result or result[-1] != value:
+            result.append(value)
+    return result
+
+
+class RecipeIngredientIndex:
+    """
+    Обратный индекс ингредиент -> рецепты в памяти процесса:
+    для каждого ингредиента хранится отсортированный array('I')
+    с id рецептов, выборки пересекают и сливают эти массивы.
+    При обращении перечитываются только рецепты, изменённые
+    с прошлого раза; чтение и догрузка идут под одной блокировкой.
+    Удалённые рецепты остаются в индексе до перезапуска процесса,
+    но отсекаются при выборке из БД.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._postings = {}
+        self._recipes = {}
+        self._watermark = None
+
+    def _set_recipe(self, recipe_id, ingredients):
+        for ingredient_id in self._recipes.get(recipe_id, ()):
+            posting = self._postings[ingredient_id]
+            del posting[bisect_left(posting, recipe_id)]
+            if not posting:
+                del self._postings[ingredient_id]
+        for ingredient_id in ingredients:
+            insort(self._postings.setdefault(
+                ingredient_id, array('I')), recipe_id)
+        self._recipes[recipe_id] = array('I', sorted(ingredients))
+
+    def _read(self, recipes=None):
+        rows = RecipeIngredients.objects.order_by()
+        if recipes is not None:
+            rows = rows.filter(recipe__in=recipes)
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in rows.values_list(
+                'recipe', 'ingredients').iterator():
+            ingredients[recipe_id].add(ingredient_id)
+        return ingredients
+
+    def _load(self, recipes=None):
+        ingredients = self._read(recipes)
+        if recipes is not None:
+            for recipe_id in recipes:
+                self._set_recipe(recipe_id, ingredients.get(recipe_id, ()))
+            return
+        postings = defaultdict(list)
+        for recipe_id in sorted(ingredients):
+            for ingredient_id in ingredients[recipe_id]:
+                postings[ingredient_id].append(recipe_id)
+        self._postings = {
+            ingredient_id: array('I', recipe_ids)
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        self._recipes = {
+            recipe_id: array('I', sorted(recipe_ingredients))
+            for recipe_id, recipe_ingredients in ingredients.items()
+        }
+
+    def _refresh(self):
+        watermark = database_now()
+        if self._watermark is None:
+            self._load()
+        else:
+            changed = list(Recipe.objects.filter(
+                updated_at__gte=self._watermark - REFRESH_OVERLAP
+            ).values_list('id', flat=True))
+            if changed:
+                self._load(changed)
+        self._watermark = watermark
+
+    def refresh(self):
+        """
+        Догружает изменения рецептов с прошлого обращения.
+        Отметка берётся по часам БД до чтения, поэтому в простое
+        повторно ничего не читается.
+        """
+        with self._lock:
+            self._refresh()
+
+    def _postings_of(self, ingredients):
+        return [
+            self._postings.get(ingredient_id, array('I'))
+            for ingredient_id in set(ingredients)
+        ]
+
+    def containing_any(self, ingredients):
+        """id рецептов, в которых есть хотя бы один из ингредиентов."""
+        with self._lock:
+            self._refresh()
+            return union(self._postings_of(ingredients)).tolist()
+
+    def match(self, include, exclude=(), min_share=None):
+        """
+        id рецептов, в которых есть все ингредиенты include
+        (или, при min_share, доля ингредиентов рецепта из include
+        не меньше min_share) и нет ни одного из exclude.
+        """
+        include = set(include)
+        with self._lock:
+            self._refresh()
+            postings = sorted(self._postings_of(include), key=len)
+            if not postings:
+                return []
+            if min_share is None:
+                recipes = postings[0]
+                for posting in postings[1:]:
+                    recipes = intersect(recipes, posting)
+            else:
+                recipes = [
+                    recipe_id
+                    for recipe_id in union(postings)
+                    if sum(
+                        ingredient_id in include
+                        for ingredient_id in self._recipes[recipe_id]
+                    ) >= min_share * len(self._recipes[recipe_id])
+                ]
+            excluded = self._postings_of(exclude)
+            return [
+                recipe_id for recipe_id in recipes
+                if not any(contains(posting, recipe_id)
+                           for posting in excluded)
+            ]
+
+
+recipe_index = RecipeIngredientIndex()
@@ -0,0 +1,114 @@
+import time
+import uuid
+from collections import namedtuple
+from threading import Lock
+from types import MappingProxyType
+
+from django.core.cache import caches
+from django.http import Http404
+
+from api.nplusone import unbudgeted
+from food.models import Ingredients, Tag
+from foodgram.settings import REFERENCE_VERSION_CHECK_INTERVAL
+
+VERSION_KEY = 'reference_data_version'
+
+ReferenceData = namedtuple('ReferenceData', (
+    'version',
+    'tags',
+    'tags_by_id',
+    'tags_by_slug',
+    'ingredients',
+    'ingredients_by_id',
+))
+
+_lock = Lock()
+_snapshot = None
+_version = None
+_checked_at = None
+
+
+def get_version():
+    """
+    Версия справочников, общая для всех процессов. Хранится в памяти
+    процесса и сверяется с кэшем версий не чаще, чем раз в
+    REFERENCE_VERSION_CHECK_INTERVAL секунд. Пропавший из кэша ключ
+    заменяется новой версией, так что устаревший снимок не выживет.
+    """
+    global _version, _checked_at
+    now = time.monotonic()
+    if (_checked_at is None
+            or now - _checked_at >= REFERENCE_VERSION_CHECK_INTERVAL):
+        cache = caches['versions']
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        _version, _checked_at = version, now
+    return _version
+
+
+def bump_version():
+    """Помечает снимки справочников во всех процессах устаревшими."""
+    global _version, _checked_at
+    version = uuid.uuid4().hex
+    caches['versions'].set(VERSION_KEY, version, None)
+    _version, _checked_at = version, time.monotonic()
+
+
+def load_reference_data(version):
+    """Читает тэги и ингредиенты из БД в неизменяемый снимок."""
+    tags = tuple(Tag.objects.all())
+    ingredients = tuple(Ingredients.objects.all())
+    return ReferenceData(
+        version=version,
+        tags=tags,
+        tags_by_id=MappingProxyType({tag.id: tag for tag in tags}),
+        tags_by_slug=MappingProxyType({tag.slug: tag for tag in tags}),
+        ingredients=ingredients,
+        ingredients_by_id=MappingProxyType(
+            {ingredient.id: ingredient for ingredient in ingredients}),
+    )
+
+
+def get_reference_data():
+    """
+    Снимок тэгов и ингредиентов в памяти процесса,
+    перечитывается из БД только после смены версии.
+    """
+    global _snapshot
+    version = get_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            with unbudgeted():
+                _snapshot = load_reference_data(version)
+        return _snapshot
+
+
+def get_reference_object(index, pk):
+    """Объект из снимка справочников по id или 404."""
+    obj = None
+    if str(pk).isdigit():
+        obj = getattr(get_reference_data(), index).get(int(pk))
+    if obj is None:
+        raise Http404
+    return obj
+
+
+def get_reference_objects(index, pks):
+    """
+    Объекты из снимка справочников по списку id за один проход.
+    Возвращает найденные объекты и список отсутствующих id.
+    """
+    objects = getattr(get_reference_data(), index)
+    found, missing = [], []
+    for pk in pks:
+        obj = objects.get(pk)
+        if obj is None:
+            missing.append(pk)
+        else:
+            found.append(obj)
+    return found, missing
@@ -0,0 +1,95 @@
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from api.autocomplete import normalize
+from food.models import Recipe
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'food_recipe_fts'
+WORD_RE = re.compile(r'\w+')
+
+RECIPE_SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+)
+
+
+def index_recipe(recipe):
+    """Обновляет поисковый индекс для рецепта."""
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=RECIPE_SEARCH_VECTOR)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, text) '
+                'VALUES (%s, %s, %s)',
+                (recipe.pk, normalize(recipe.name), normalize(recipe.text))
+            )
+
+
+def index_recipes(queryset, batch_size=1000):
+    """Обновляет поисковый индекс для всех рецептов queryset."""
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=RECIPE_SEARCH_VECTOR)
+    elif connection.vendor == 'sqlite':
+        rows = queryset.values_list('pk', 'name', 'text').order_by()
+        with connection.cursor() as cursor:
+            for start in range(0, rows.count(), batch_size):
+                cursor.executemany(
+                    f'INSERT OR REPLACE INTO {FTS_TABLE} '
+                    '(rowid, name, text) VALUES (%s, %s, %s)',
+                    [
+                        (pk, normalize(name), normalize(text))
+                        for pk, name, text in rows[start:start + batch_size]
+                    ]
+                )
+
+
+def unindex_recipe(recipe):
+    """Удаляет рецепт из поискового индекса SQLite."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (recipe.pk,))
+
+
+def fts_query(search):
+    """Запрос FTS5 из слов поиска: каждое слово как префикс."""
+    return ' '.join(
+        f'"{word}"*' for word in WORD_RE.findall(normalize(search)))
+
+
+def search_recipes(queryset, search):
+    """
+    Полнотекстовый поиск по названию и описанию с ранжированием:
+    tsvector с русской морфологией на PostgreSQL, FTS5 на SQLite.
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            search, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date')
+    if connection.vendor == 'sqlite':
+        query = fts_query(search)
+        if not query:
+            return queryset.none()
+        # bm25 в FTS5 тем меньше, чем лучше совпадение,
+        # совпадение в названии весит больше, чем в описании
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (query,)
+        )).annotate(rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = food_recipe.id',
+            (query,),
+            output_field=FloatField()
+        )).order_by('-rank', '-pub_date')
+    return queryset.filter(
+        Q(name__icontains=search) | Q(text__icontains=search))
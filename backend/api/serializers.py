@@ -1,10 +1,16 @@
+from collections.abc import Mapping
+
 from django.contrib.auth.password_validation import validate_password
-from django.db.models import F
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
+from rest_framework.settings import api_settings
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ReferencePrimaryKeyField
+from api.reference import get_reference_objects
+from api.shopping_cart import ingredients_changed, shopping_lists_paused
 from food.models import Tag, Ingredients, Recipe, RecipeIngredients
+from food.renditions import rendition_urls
 from users.models import CustomUser
 from users.serializers import UserSerializer
 
@@ -46,11 +52,7 @@ class SubscriptionsRecipeSerializer(serializers.ModelSerializer):
 
 class UserSubscriptionSerializer(UserSerializer):
     """Сериализатор для эндпоинта /subscriptions."""
-    recipes = SubscriptionsRecipeSerializer(many=True, read_only=True)
-    recipes_count = serializers.IntegerField(
-        source='recipes.count',
-        read_only=True
-    )
+    recipes = SerializerMethodField()
 
     class Meta:
         model = CustomUser
@@ -75,6 +77,17 @@ class UserSubscriptionSerializer(UserSerializer):
             'recipes_count',
         )
 
+    def get_recipes(self, obj):
+        """Последние рецепты автора с учётом recipes_limit."""
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = self.context.get('recipes_limit')
+            if limit is not None:
+                recipes = recipes[:limit]
+        return SubscriptionsRecipeSerializer(
+            recipes, many=True, context=self.context).data
+
 
 class ChangePasswordSerializer(serializers.ModelSerializer):
     """Сериализатор для смены пароля"""
@@ -96,6 +109,7 @@ class ListRecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
     ingredients = SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -111,6 +125,7 @@ class ListRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time',
         )
@@ -120,8 +135,15 @@ class ListRecipeSerializer(serializers.ModelSerializer):
 
     def get_ingredients(self, obj):
         """Получает список ингридиентов для рецепта."""
-        return obj.ingredients.values('id', 'name', 'measurement_unit',
-                                      amount=F('ingredient__amount'))
+        return [
+            {
+                'id': item.ingredients.id,
+                'name': item.ingredients.name,
+                'measurement_unit': item.ingredients.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.recipe.all()
+        ]
 
     def get_image(self, obj):
         if self.context.get('request').is_secure():
@@ -130,8 +152,21 @@ class ListRecipeSerializer(serializers.ModelSerializer):
         return 'http://' + str(self.context.get('request').
                                get_host()) + str(obj.image.url)
 
+    def get_image_renditions(self, obj):
+        """Ссылки на уменьшенные копии картинки в формате WebP."""
+        request = self.context.get('request')
+        return {
+            rendition: request.build_absolute_uri(url)
+            for rendition, url in rendition_urls(
+                obj.image.name,
+                obj.renditions_image == obj.image.name
+            ).items()
+        }
+
     def get_is_favorited(self, obj):
         """Запрос избранного"""
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -139,15 +174,25 @@ class ListRecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Запрос списка покупок"""
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.is_in_shopping_cart.filter(id=obj.id).exists()
 
 
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Заменяет картинку рецепта файлом из multipart или тела запроса."""
+    image = Base64ImageField()
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
+
+
 class CreateAmountSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredients.objects.all(),
+    id = serializers.IntegerField(
         required=True
     )
     amount = serializers.IntegerField(
@@ -161,7 +206,8 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         many=True,
         required=True
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = ReferencePrimaryKeyField(
+        index='tags_by_id',
         many=True,
         queryset=Tag.objects.all(),
         required=True
@@ -179,23 +225,51 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
-    def validate(self, data):
+    def to_internal_value(self, data):
         """
-        Проверка ингридиентов
-        к сожалению frontend не ловит ошибки в validate_ingredients
+        Если поля не прошли проверку, ингредиенты всё равно сверяются:
+        неверный тэг не скрывает несуществующий ингредиент.
         """
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_set = set()
-        for ingredient in ingredients:
-            if int(ingredient.get('amount')) <= 0:
-                raise serializers.ValidationError(
-                    'Количество не может быть отрицательным'
-                )
-            ingredients_set.add(ingredient['id'])
-        if len(ingredients_set) != len(ingredients):
+        try:
+            return super().to_internal_value(data)
+        except serializers.ValidationError as error:
+            errors = error.detail
+            if (isinstance(data, Mapping) and 'ingredients' in data
+                    and 'ingredients' not in errors):
+                try:
+                    self.check_ingredients(self.fields[
+                        'ingredients'].run_validation(data['ingredients']))
+                except serializers.ValidationError as ingredients_error:
+                    errors[api_settings.NON_FIELD_ERRORS_KEY] = (
+                        ingredients_error.detail)
+            raise serializers.ValidationError(errors)
+
+    def check_ingredients(self, ingredients):
+        """Проверяет ингредиенты и подставляет объекты вместо id."""
+        if any(ingredient['amount'] <= 0 for ingredient in ingredients):
+            raise serializers.ValidationError(
+                'Количество не может быть отрицательным'
+            )
+        ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ids)) != len(ids):
             raise serializers.ValidationError(
                 'Такой ингредиент уже выбран')
+        objects, missing = get_reference_objects('ingredients_by_id', ids)
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиентов с id {} не существует.'.format(
+                    ', '.join(map(str, missing))))
+        for ingredient, obj in zip(ingredients, objects):
+            ingredient['id'] = obj
 
+    def validate(self, data):
+        """
+        Проверка ингридиентов
+        к сожалению frontend не ловит ошибки в validate_ingredients
+        """
+        ingredients = data.get('ingredients')
+        if ingredients is not None:
+            self.check_ingredients(ingredients)
         return data
 
     def validate_tags(self, value):
@@ -204,18 +278,14 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Нужно выбрать тэг'
             )
-        tags = self.initial_data.get('tags')
-        tags_set = set()
-        for tag in tags:
-            tags_set.add(tag)
-        if len(tags_set) != len(tags):
+        if len({tag.id for tag in value}) != len(value):
             raise serializers.ValidationError(
                 'Такой тэг уже есть'
             )
         return value
 
     def validate_cooking_time(self, value):
-        if int(self.initial_data.get('cooking_time')) <= 0:
+        if value <= 0:
             raise serializers.ValidationError(
                 'Время не может быть отрицательным'
             )
@@ -231,8 +301,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
             menu_list.append(recipe_list)
 
+    @transaction.atomic
     def create(self, validated_data):
-        """Создаёт рецепт."""
+        """Создаёт рецепт в одной транзакции."""
         menu_list = []
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -248,19 +319,46 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        """
+        Сверяет состав рецепта с сохранённым: вставляет новые пары,
+        удаляет убранные и обновляет изменившиеся количества.
+        """
+        stored = {
+            item.ingredients_id: item
+            for item in RecipeIngredients.objects.filter(recipe=instance)
+        }
+        wanted = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = {key: item.amount for key, item in stored.items()}
+        removed = stored.keys() - wanted.keys()
+        if removed:
+            with shopping_lists_paused():
+                RecipeIngredients.objects.filter(
+                    recipe=instance, ingredients__in=removed).delete()
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(
+                recipe=instance, ingredients_id=key, amount=amount)
+            for key, amount in wanted.items() if key not in stored
+        ])
+        changed = []
+        for key, item in stored.items():
+            if key in wanted and item.amount != wanted[key]:
+                item.amount = wanted[key]
+                changed.append(item)
+        RecipeIngredients.objects.bulk_update(changed, ('amount',))
+        ingredients_changed(instance, old_amounts, wanted)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Обновляет рецепт."""
-        menu_list = []
-        instance.tags.clear()
-        RecipeIngredients.objects.filter(recipe=instance).all().delete()
-        tags = validated_data.pop('tags')
-        for tag in tags:
-            instance.tags.add(tag)
-        self.create_ingredients(
-            validated_data.pop('ingredients'),
-            instance,
-            menu_list
-        )
-        RecipeIngredients.objects.bulk_create(menu_list)
+        """Обновляет рецепт, меняя только изменившиеся связи."""
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
 
         return super().update(instance, validated_data)
@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from food.models import Recipe, RecipeIngredients, ShoppingList
+from users.models import CustomUser
+
+_paused = ContextVar('shopping_lists_paused', default=False)
+
+
+@contextmanager
+def shopping_lists_paused():
+    """
+    Сигналы корзины и состава рецептов не трогают списки покупок внутри
+    блока: массовые операции переносят изменение в списки сами.
+    """
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def shopping_lists_are_paused():
+    return _paused.get()
+
+
+def recipe_amounts(recipe_ids):
+    """Суммарное количество ингредиентов в рецептах {ingredient_id: amount}."""
+    return dict(RecipeIngredients.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('ingredients').annotate(
+        amount=Sum('amount')
+    ).order_by())
+
+
+def apply_delta(user_ids, delta):
+    """
+    Прибавляет delta {ingredient_id: amount} к спискам покупок
+    пользователей: вставка недостающих строк, одно UPDATE на всех
+    и удаление обнулившихся строк.
+    """
+    delta = {key: value for key, value in delta.items() if value}
+    user_ids = list(user_ids)
+    if not delta or not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingList.objects.bulk_create(
+            [
+                ShoppingList(user_id=user_id, ingredients_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id in delta
+            ],
+            ignore_conflicts=True
+        )
+        ShoppingList.objects.filter(
+            user__in=user_ids,
+            ingredients__in=delta,
+        ).update(
+            amount=F('amount') + Case(
+                *(When(ingredients=key, then=Value(value))
+                  for key, value in delta.items()),
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+        ShoppingList.objects.filter(
+            user__in=user_ids,
+            amount__lte=0,
+        ).delete()
+
+
+def cart_users(recipe_id):
+    """id пользователей, у которых рецепт лежит в корзине."""
+    return Recipe.is_in_shopping_cart.through.objects.filter(
+        recipe=recipe_id).values_list('customuser', flat=True)
+
+
+def add_to_cart(user, recipe_ids):
+    """Учитывает добавленные в корзину рецепты."""
+    apply_delta((user.id,), recipe_amounts(recipe_ids))
+
+
+def remove_from_cart(user, recipe_ids):
+    """Учитывает удалённые из корзины рецепты."""
+    apply_delta((user.id,), {
+        key: -value for key, value in recipe_amounts(recipe_ids).items()
+    })
+
+
+def ingredients_changed(recipe, old_amounts, new_amounts=None):
+    """
+    Переносит изменение состава рецепта в списки покупок
+    пользователей, у которых рецепт лежит в корзине.
+    """
+    if new_amounts is None:
+        new_amounts = recipe_amounts((recipe.id,))
+    if new_amounts == old_amounts:
+        return
+    delta = {
+        key: new_amounts.get(key, 0) - old_amounts.get(key, 0)
+        for key in new_amounts.keys() | old_amounts.keys()
+    }
+    apply_delta(
+        recipe.is_in_shopping_cart.values_list('id', flat=True), delta)
+
+
+def expected_shopping_lists(user_ids):
+    """Списки покупок пользователей, посчитанные заново из корзин."""
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in RecipeIngredients.objects.filter(
+            recipe__is_in_shopping_cart__in=user_ids
+        ).values_list(
+            'recipe__is_in_shopping_cart', 'ingredients'
+        ).annotate(amount=Sum('amount')).order_by()
+    }
+
+
+def rebuild_user_shopping_lists(user_ids, fix):
+    """Сверяет и при fix=True исправляет списки покупок пользователей."""
+    expected = expected_shopping_lists(user_ids)
+    stored = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in ShoppingList.objects.filter(
+            user__in=user_ids).values_list('user', 'ingredients', 'amount')
+    }
+    drifted = {
+        key for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    }
+    users = {user_id for user_id, ingredient_id in drifted}
+    if fix and users:
+        with transaction.atomic():
+            ShoppingList.objects.filter(user__in=users).delete()
+            ShoppingList.objects.bulk_create(
+                ShoppingList(
+                    user_id=user_id,
+                    ingredients_id=ingredient_id,
+                    amount=amount,
+                )
+                for (user_id, ingredient_id), amount in expected.items()
+                if user_id in users
+            )
+    return len(drifted)
+
+
+def rebuild_shopping_lists(fix=True, batch_size=500):
+    """
+    Сверяет сохранённые списки покупок с корзинами пачками
+    по batch_size пользователей, возвращает число расхождений
+    и при fix=True исправляет их.
+    """
+    drifted = 0
+    users = CustomUser.objects.order_by('pk').values_list('pk', flat=True)
+    batch = list(users[:batch_size])
+    while batch:
+        drifted += rebuild_user_shopping_lists(batch, fix)
+        batch = list(users.filter(pk__gt=batch[-1])[:batch_size])
+    return drifted
@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.counters import (M2M_COUNTERS, change_counter, change_m2m_counter,
+                          clear_m2m_counter, keep_existing_links)
+from api.feed import Subscription, fan_out, subscribed, unsubscribed
+from api.reference import bump_version
+from api.search import index_recipe, unindex_recipe
+from api.shopping_cart import (apply_delta, cart_users, recipe_amounts,
+                               shopping_lists_are_paused)
+from food.models import FeedEntry, Ingredients, Recipe, RecipeIngredients, Tag
+from food.renditions import delete_renditions, schedule_renditions
+from users.models import CustomUser
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredients)
+def reference_data_changed(**kwargs):
+    """Сбрасывает снимок справочников во всех процессах."""
+    transaction.on_commit(bump_version)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    """Вычитает удаляемый рецепт из списков покупок."""
+    apply_delta(
+        instance.is_in_shopping_cart.values_list('id', flat=True),
+        {
+            key: -value
+            for key, value in recipe_amounts((instance.id,)).items()
+        }
+    )
+
+
+def drop_renditions(image_name):
+    """Удаляет копии картинки, если её не использует другой рецепт."""
+    if not Recipe.objects.filter(image=image_name).exists():
+        delete_renditions(image_name)
+
+
+@receiver(post_init, sender=Recipe)
+def recipe_loaded(instance, **kwargs):
+    """Запоминает картинку рецепта, чтобы заметить её замену."""
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image) or None
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    """
+    Создаёт уменьшенные копии новой картинки после сохранения рецепта
+    и удаляет копии заменённой.
+    """
+    if created:
+        change_counter(CustomUser, 'recipes_count', (instance.author_id,), 1)
+    image_name = instance.image.name or None
+    old_name = getattr(instance, '_loaded_image', None)
+    instance._loaded_image = image_name
+    if image_name and (created or image_name != old_name):
+        transaction.on_commit(lambda: schedule_renditions(image_name))
+    if old_name and old_name != image_name:
+        transaction.on_commit(lambda: drop_renditions(old_name))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_counted_deleted(instance, **kwargs):
+    """Уменьшает счётчик рецептов автора и удаляет копии картинки."""
+    change_counter(CustomUser, 'recipes_count', (instance.author_id,), -1)
+    if instance.image:
+        image_name = instance.image.name
+        transaction.on_commit(lambda: drop_renditions(image_name))
+
+
+@receiver(pre_delete, sender=CustomUser)
+def user_deleted(instance, **kwargs):
+    """Уменьшает счётчики объектов, связанных с удаляемым пользователем."""
+    change_counter(Recipe, 'favorites_count',
+                   instance.is_favorited.values('id'), -1)
+    change_counter(Recipe, 'shopping_cart_count',
+                   instance.is_in_shopping_cart.values('id'), -1)
+    change_counter(CustomUser, 'subscribers_count',
+                   instance.is_subscribed.values('id'), -1)
+
+
+def m2m_counted_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддерживает счётчики избранного, корзины и подписчиков."""
+    if action == 'pre_remove':
+        keep_existing_links(sender, instance, reverse, pk_set)
+    elif action == 'post_add':
+        change_m2m_counter(sender, instance, reverse, pk_set, 1)
+    elif action == 'post_remove':
+        change_m2m_counter(sender, instance, reverse, pk_set, -1)
+    elif action == 'pre_clear':
+        clear_m2m_counter(sender, instance, reverse)
+
+
+for through in M2M_COUNTERS:
+    m2m_changed.connect(m2m_counted_changed, sender=through)
+
+
+@receiver(m2m_changed, sender=Recipe.is_in_shopping_cart.through)
+def cart_changed(instance, action, reverse, pk_set, **kwargs):
+    """Переносит добавление и удаление рецептов корзины в списки покупок."""
+    if shopping_lists_are_paused():
+        return
+    if action == 'pre_clear':
+        pk_set = set(instance.is_in_shopping_cart.values_list(
+            'id', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    if not pk_set:
+        return
+    if reverse:
+        user_ids, recipe_ids = (instance.pk,), pk_set
+    else:
+        user_ids, recipe_ids = pk_set, (instance.pk,)
+    apply_delta(user_ids, {
+        key: sign * value
+        for key, value in recipe_amounts(recipe_ids).items()
+    })
+
+
+@receiver(post_init, sender=RecipeIngredients)
+def recipe_ingredient_loaded(instance, **kwargs):
+    """Запоминает строку состава, чтобы перенести её изменение."""
+    instance._loaded_row = (
+        instance.__dict__.get('recipe_id'),
+        instance.__dict__.get('ingredients_id'),
+        instance.__dict__.get('amount'),
+    )
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def recipe_ingredient_saved(instance, created, **kwargs):
+    """Переносит изменение строки состава рецепта в списки покупок."""
+    old_recipe, old_ingredient, old_amount = instance._loaded_row
+    instance._loaded_row = (
+        instance.recipe_id, instance.ingredients_id, instance.amount)
+    if shopping_lists_are_paused():
+        return
+    delta = {instance.ingredients_id: instance.amount}
+    if not created and old_amount:
+        if old_recipe == instance.recipe_id:
+            delta[old_ingredient] = delta.get(old_ingredient, 0) - old_amount
+        else:
+            apply_delta(cart_users(old_recipe), {old_ingredient: -old_amount})
+    apply_delta(cart_users(instance.recipe_id), delta)
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def recipe_ingredient_deleted(instance, **kwargs):
+    """
+    Вычитает удалённую строку состава из списков покупок. При удалении
+    рецепта корзины к этому моменту уже очищены, а сам рецепт вычтен
+    в recipe_deleted.
+    """
+    if shopping_lists_are_paused():
+        return
+    apply_delta(
+        cart_users(instance.recipe_id),
+        {instance.ingredients_id: -instance.amount})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_indexed(instance, **kwargs):
+    """Обновляет поисковый индекс после сохранения рецепта."""
+    index_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_unindexed(instance, **kwargs):
+    """Удаляет рецепт из поискового индекса."""
+    unindex_recipe(instance)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    """Отзывает удалённый токен (logout) из кэша аутентификации."""
+    token_cache.revoke(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(instance, created, **kwargs):
+    """Сбрасывает кэш токенов пользователя: его могли заблокировать."""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+            'key', flat=True):
+        token_cache.revoke(key)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(instance, created, **kwargs):
+    """Раскладывает новый рецепт по лентам подписчиков."""
+    if created:
+        fan_out(instance)
+
+
+@receiver(m2m_changed, sender=Subscription)
+def subscriptions_changed(instance, action, reverse, pk_set, **kwargs):
+    """Поддерживает ленты при изменении подписок через ORM и админку."""
+    if action == 'pre_clear':
+        FeedEntry.objects.filter(
+            **{'recipe__author' if reverse else 'user': instance}).delete()
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    changed = subscribed if action == 'post_add' else unsubscribed
+    if reverse:
+        for user_id in pk_set:
+            changed(user_id, (instance.id,))
+    else:
+        changed(instance.id, pk_set)
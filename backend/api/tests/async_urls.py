@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from api.async_views import asyncify
+from api.urls import router
+
+urlpatterns = (
+    path('api/', include((asyncify(router.urls), 'api'), namespace='api')),
+)
@@ -0,0 +1,80 @@
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.reference import bump_version
+from food.models import Ingredients, Recipe, RecipeIngredients, Tag
+from users.models import CustomUser
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reference',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'versions',
+    },
+}
+
+
+def create_user(name, **kwargs):
+    return CustomUser.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name=name,
+        last_name=name,
+        password='Pa55word-test',
+        **kwargs
+    )
+
+
+@override_settings(
+    CACHES=TEST_CACHES,
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class APITestBase(APITestCase):
+    """Пользователи, тэги и ингредиенты, общие для тестов API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тэг {number}', color='#ffffff', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredients.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(10)
+        ]
+
+    def setUp(self):
+        bump_version()
+
+    def create_recipe(self, name, author=None, ingredients=None):
+        """Рецепт с двумя тэгами и ингредиентами {номер: количество}."""
+        recipe = Recipe.objects.create(
+            author=author or self.author,
+            name=name,
+            text='Описание',
+            image='food/test.png',
+            cooking_time=10,
+        )
+        recipe.tags.set(self.tags[:2])
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe,
+                ingredients=self.ingredients[number],
+                amount=amount,
+            )
+            for number, amount in (ingredients or {0: 100, 1: 2}).items()
+        )
+        return recipe
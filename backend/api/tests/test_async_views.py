@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from api import async_views
+from api.reference import bump_version
+from api.tests.base import TEST_CACHES, create_user
+from food.models import Ingredients, Recipe, RecipeIngredients, Tag
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AsyncViewsTest(APITransactionTestCase):
+    """Маршруты из ASYNC_ROUTES под ASGI отвечают так же, как WSGI."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'SQLite в памяти не видна из потоков пула, '
+                'задайте DB_TEST_NAME')
+        bump_version()
+        self.user = create_user('reader')
+        self.token = Token.objects.create(user=self.user).key
+        tag = Tag.objects.create(name='Тэг', color='#ffffff', slug='tag')
+        ingredient = Ingredients.objects.create(
+            name='Соль', measurement_unit='г')
+        with mock.patch('api.signals.schedule_renditions'):
+            self.recipe = Recipe.objects.create(
+                author=create_user('author'),
+                name='Рецепт',
+                text='Описание',
+                image='food/test.png',
+                cooking_time=10,
+            )
+        self.recipe.tags.add(tag)
+        RecipeIngredients.objects.create(
+            recipe=self.recipe, ingredients=ingredient, amount=5)
+        self.recipe.is_in_shopping_cart.add(self.user)
+
+    def sync_get(self, url):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        return client.get(url)
+
+    def async_request(self, method, url, **kwargs):
+        client = AsyncClient()
+
+        async def send():
+            return await getattr(client, method)(
+                url, authorization=f'Token {self.token}', **kwargs)
+
+        with override_settings(ROOT_URLCONF='api.tests.async_urls'):
+            return async_to_sync(send)()
+
+    def test_same_responses(self):
+        for url in (
+            '/api/recipes/',
+            f'/api/recipes/{self.recipe.id}/',
+            '/api/ingredients/?name=со',
+        ):
+            with self.subTest(url=url), \
+                    mock.patch.object(
+                        async_views, 'run_view',
+                        wraps=async_views.run_view) as run_view:
+                expected = self.sync_get(url)
+                response = self.async_request('get', url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    json.loads(response.content),
+                    json.loads(expected.content))
+                run_view.assert_called_once()
+
+    def test_streaming_download(self):
+        url = '/api/recipes/download_shopping_cart/'
+        expected = self.sync_get(url)
+        response = self.async_request('get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b''.join(expected.streaming_content))
+
+    def test_writes_stay_synchronous(self):
+        with mock.patch.object(async_views, 'run_view') as run_view:
+            response = self.async_request(
+                'post', '/api/recipes/', data={},
+                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', json.loads(response.content))
+        run_view.assert_not_called()
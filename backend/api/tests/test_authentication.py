@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import StatelessJWTAuthentication
+from api.tests.base import APITestBase
+from users.models import CustomUser
+
+
+class CachedTokenAuthenticationTest(APITestBase):
+    """Кэш токенов не отдаёт устаревшего пользователя и отозванный токен."""
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_known_token_skips_token_query(self):
+        self.client.get('/api/users/me/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['id'], self.reader.id)
+
+    def test_user_is_loaded_fresh(self):
+        self.client.get('/api/users/me/')
+        CustomUser.objects.filter(pk=self.reader.pk).update(
+            first_name='Новое имя')
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['first_name'], 'Новое имя')
+
+    def test_revoked_token_after_cache_loss(self):
+        self.client.get('/api/users/me/')
+        self.token.delete()
+        caches['reference'].clear()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user(self):
+        self.client.get('/api/users/me/')
+        self.reader.is_active = False
+        self.reader.save()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+
+@mock.patch.object(
+    APIView, 'authentication_classes', [StatelessJWTAuthentication])
+class StatelessJWTAuthenticationTest(APITestBase):
+    """JWT проверяется без БД, пользователь — при первой загрузке."""
+
+    def setUp(self):
+        super().setUp()
+        token = AccessToken.for_user(self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_active_user(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['id'], self.reader.id)
+
+    def test_deactivated_user(self):
+        CustomUser.objects.filter(pk=self.reader.pk).update(is_active=False)
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'].code, 'user_inactive')
+
+    def test_deleted_user(self):
+        CustomUser.objects.filter(pk=self.reader.pk).delete()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'].code, 'user_not_found')
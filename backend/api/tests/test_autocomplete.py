@@ -0,0 +1,24 @@
+from api.tests.base import APITestBase
+from food.models import Ingredients
+
+
+class IngredientAutocompleteTest(APITestBase):
+    """Префиксные совпадения раньше вхождений, ё и е не различаются."""
+
+    def setUp(self):
+        super().setUp()
+        for name in ('Свёкла', 'Мёд', 'Медовик', 'Сахар с мёдом', 'Лимон'):
+            Ingredients.objects.create(name=name, measurement_unit='г')
+
+    def names(self, query):
+        response = self.client.get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(
+            self.names('мед'), ['Мёд', 'Медовик', 'Сахар с мёдом'])
+
+    def test_yo(self):
+        self.assertEqual(self.names('свекл'), ['Свёкла'])
+        self.assertEqual(self.names('МЁД'), self.names('мед'))
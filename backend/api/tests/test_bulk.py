@@ -0,0 +1,71 @@
+from unittest import mock
+
+from api.tests.base import APITestBase, create_user
+from food.models import Recipe
+
+
+class BulkFavoriteCartSubscribeTest(APITestBase):
+    """Пакетные избранное, корзина и подписки."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [self.create_recipe(f'Рецепт {n}') for n in range(2)]
+        self.ids = [recipe.id for recipe in self.recipes]
+        self.client.force_authenticate(self.reader)
+
+    def post(self, url, ids):
+        return self.client.post(url, {'ids': ids}, format='json')
+
+    def test_add_and_remove(self):
+        response = self.post('/api/recipes/favorite/', self.ids + [999])
+        self.assertEqual(response.data, {
+            'changed': self.ids, 'unchanged': [], 'not_found': [999]})
+        response = self.post('/api/recipes/favorite/', self.ids)
+        self.assertEqual(response.data['unchanged'], self.ids)
+        self.assertEqual(
+            list(Recipe.objects.values_list('favorites_count', flat=True)),
+            [1, 1])
+        response = self.client.delete(
+            '/api/recipes/favorite/', {'ids': self.ids[:1]}, format='json')
+        self.assertEqual(response.data['changed'], self.ids[:1])
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'favorites_count', flat=True)),
+            [0, 1])
+
+    def test_shopping_cart(self):
+        self.post('/api/recipes/shopping_cart/', self.ids)
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_subscribe_self(self):
+        response = self.post('/api/users/subscribe/', [self.reader.id])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.reader.is_subscribed.exists())
+
+    def test_subscribe_self_single(self):
+        response = self.client.post(f'/api/users/{self.reader.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.reader.is_subscribed.exists())
+
+    @mock.patch('api.utils.BULK_IDS_MAX', 2)
+    def test_too_many_ids(self):
+        response = self.post('/api/recipes/favorite/', self.ids + [999])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Recipe.is_favorited.through.objects.exists())
+        response = self.post('/api/recipes/favorite/', self.ids)
+        self.assertEqual(response.data['changed'], self.ids)
+
+    def test_subscribe(self):
+        other = create_user('other')
+        response = self.post(
+            '/api/users/subscribe/', [self.author.id, other.id])
+        self.assertEqual(response.data['changed'], [self.author.id, other.id])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+
+    def test_invalid_ids(self):
+        for ids in ([True], ['1'], 1):
+            with self.subTest(ids=ids):
+                response = self.post('/api/recipes/favorite/', ids)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,41 @@
+from api.tests.base import APITestBase, create_user
+from food.models import Recipe
+from users.models import CustomUser
+
+
+class CountersSaveTest(APITestBase):
+    """Обычный save() не перезаписывает счётчики значениями из памяти."""
+
+    def setUp(self):
+        super().setUp()
+        self.stale_author = CustomUser.objects.get(id=self.author.id)
+        self.recipe = self.create_recipe('Рецепт')
+        self.stale_recipe = Recipe.objects.get(id=self.recipe.id)
+        for number in range(15):
+            follower = create_user(f'follower{number}')
+            follower.is_subscribed.add(self.author)
+            self.recipe.is_favorited.add(follower)
+
+    def test_set_password_keeps_subscribers_count(self):
+        self.client.force_authenticate(self.stale_author)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'New-pa55word-test',
+            'new_password': 'New-pa55word-test',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 15)
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertTrue(self.author.check_password('New-pa55word-test'))
+
+    def test_stale_recipe_save_keeps_favorites_count(self):
+        self.stale_recipe.text = 'Новое описание'
+        self.stale_recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 15)
+        self.assertEqual(self.recipe.text, 'Новое описание')
+
+    def test_new_objects_are_inserted(self):
+        user = create_user('newcomer')
+        self.assertEqual(user.subscribers_count, 0)
+        self.assertTrue(CustomUser.objects.filter(id=user.id).exists())
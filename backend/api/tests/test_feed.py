@@ -0,0 +1,71 @@
+from unittest import mock
+
+from api.tests.base import APITestBase, create_user
+from food.models import FeedEntry
+
+
+class FeedTest(APITestBase):
+    """Лента подписок: раскладка, догрузка, отписка и pull популярных."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, author):
+        response = self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def feed(self, limit=10):
+        ids, url = [], f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def entries(self):
+        return sorted(FeedEntry.objects.filter(
+            user=self.reader).values_list('recipe', flat=True))
+
+    def test_fan_out_on_create(self):
+        self.subscribe(self.author)
+        recipe = self.create_recipe('Новый рецепт')
+        self.assertEqual(self.entries(), [recipe.id])
+        self.assertEqual(self.feed(), [recipe.id])
+
+    @mock.patch('api.feed.FEED_BACKFILL_SIZE', 2)
+    def test_backfill_on_subscribe(self):
+        recipes = [self.create_recipe(f'Рецепт {n}') for n in range(3)]
+        self.subscribe(self.author)
+        self.assertEqual(self.entries(), [recipes[1].id, recipes[2].id])
+        self.assertEqual(self.feed(), [recipes[2].id, recipes[1].id])
+
+    def test_removed_on_unsubscribe(self):
+        other = create_user('other')
+        kept = self.create_recipe('Чужой рецепт', author=other)
+        self.create_recipe('Рецепт')
+        self.subscribe(self.author)
+        self.subscribe(other)
+        response = self.client.delete(
+            f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.entries(), [kept.id])
+        self.assertEqual(self.feed(), [kept.id])
+
+    @mock.patch('api.feed.FEED_FANOUT_MAX_FOLLOWERS', 1)
+    def test_pulled_authors_are_merged(self):
+        popular = create_user('popular')
+        create_user('fan').is_subscribed.add(popular)
+        self.subscribe(self.author)
+        self.subscribe(popular)
+        recipes = [
+            self.create_recipe(
+                f'Рецепт {n}', author=(self.author, popular)[n % 2])
+            for n in range(5)
+        ]
+        self.assertEqual(
+            self.entries(), [recipes[0].id, recipes[2].id, recipes[4].id])
+        expected = [recipe.id for recipe in reversed(recipes)]
+        self.assertEqual(self.feed(), expected)
+        self.assertEqual(self.feed(limit=2), expected)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, override_settings
+
+from api.tests.base import APITestBase
+from foodgram.handlers import APIASGIHandler, APIWSGIHandler, wsgi_dispatch
+from foodgram.settings import API_MIDDLEWARE
+
+
+class RecordingMiddleware:
+    """Запоминает settings.MIDDLEWARE на момент сборки цепочки."""
+    seen = []
+
+    def __init__(self, get_response):
+        self.seen.append(list(settings.MIDDLEWARE))
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+
+class RecordingAPIHandler(APIWSGIHandler):
+    middleware = [f'{__name__}.RecordingMiddleware'] + API_MIDDLEWARE
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class APIHandlerTest(APITestBase):
+    """Короткая цепочка middleware для /api/."""
+
+    def test_settings_untouched(self):
+        RecordingMiddleware.seen.clear()
+        middleware = list(settings.MIDDLEWARE)
+        RecordingAPIHandler()
+        self.assertEqual(RecordingMiddleware.seen, [middleware])
+        self.assertEqual(settings.MIDDLEWARE, middleware)
+
+    def test_lean_chain(self):
+        request = RequestFactory().get('/api/tags/')
+        response = APIWSGIHandler().get_response(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 3)
+        self.assertFalse(hasattr(request, 'session'))
+        request = RequestFactory().get('/api/tags/')
+        WSGIHandler().get_response(request)
+        self.assertTrue(hasattr(request, 'session'))
+
+    def test_async_chain(self):
+        handler = APIASGIHandler()
+        self.assertTrue(asyncio.iscoroutinefunction(handler._middleware_chain))
+
+    def test_dispatch(self):
+        application = wsgi_dispatch(
+            lambda environ, start_response: 'site',
+            lambda environ, start_response: 'api')
+        self.assertEqual(application({'PATH_INFO': '/api/tags/'}, None), 'api')
+        self.assertEqual(application({'PATH_INFO': '/admin/'}, None), 'site')
@@ -0,0 +1,75 @@
+import base64
+import io
+from unittest import mock
+
+from PIL import Image
+
+from api.tests.base import APITestBase
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), (200, 120, 60)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@mock.patch('api.signals.schedule_renditions')
+class ImageUploadTest(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe('Рецепт')
+        self.url = f'/api/recipes/{self.recipe.id}/image/'
+        self.client.force_authenticate(self.author)
+
+    def assertImageReplaced(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.name, 'food/test.png')
+        self.assertEqual(self.recipe.image.read(), png_bytes())
+
+    def test_multipart(self, schedule_renditions):
+        image = io.BytesIO(png_bytes())
+        image.name = 'photo.png'
+        response = self.client.put(
+            self.url, {'image': image}, format='multipart')
+        self.assertImageReplaced(response)
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    def test_raw_body_with_filename(self, schedule_renditions):
+        response = self.client.put(
+            self.url, png_bytes(), content_type='image/png',
+            HTTP_CONTENT_DISPOSITION='attachment; filename=photo.png')
+        self.assertImageReplaced(response)
+        self.assertIn('photo', self.recipe.image.name)
+
+    def test_raw_body_without_filename(self, schedule_renditions):
+        response = self.client.put(
+            self.url, png_bytes(), content_type='image/png')
+        self.assertImageReplaced(response)
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    def test_raw_body_not_an_image(self, schedule_renditions):
+        response = self.client.put(
+            self.url, b'not an image', content_type='image/png')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    @mock.patch('api.fields.RECIPE_IMAGE_MAX_SIZE', 100)
+    def test_raw_body_over_limit(self, schedule_renditions):
+        response = self.client.put(
+            self.url, png_bytes() + bytes(100), content_type='image/png')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    @mock.patch('api.fields.RECIPE_IMAGE_MAX_SIZE', 100)
+    def test_base64_over_limit(self, schedule_renditions):
+        payload = base64.b64encode(bytes(200)).decode()
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'image': f'data:image/png;base64,{payload}'},
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['image'],
+            ['Размер картинки не должен превышать 100 байт.'])
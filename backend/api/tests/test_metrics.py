@@ -0,0 +1,25 @@
+from unittest import mock
+
+from api.tests.base import APITestBase
+
+
+class MetricsAccessTest(APITestBase):
+    """/metrics доступен только разрешённым адресам или по токену."""
+
+    def test_local_address(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_address(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 403)
+
+    @mock.patch('api.metrics.METRICS_TOKEN', 'secret')
+    def test_token(self):
+        for header, status in (('Bearer secret', 200), ('Bearer wrong', 403),
+                               ('Bearer секрет', 403)):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/metrics', REMOTE_ADDR='10.0.0.5',
+                    HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, status)
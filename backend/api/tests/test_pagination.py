@@ -0,0 +1,59 @@
+import base64
+
+from django.utils import timezone
+
+from api.tests.base import APITestBase
+from food.models import Recipe
+
+
+class CursorPaginationTest(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        for number in range(7):
+            self.create_recipe(f'Рецепт {number}')
+        Recipe.objects.update(pub_date=timezone.now())
+        self.expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True))
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, page):
+        return [recipe['id'] for recipe in page['results']]
+
+    def test_next_links_with_equal_pub_date(self):
+        page = self.page('/api/recipes/?limit=3&cursor=')
+        self.assertIsNone(page['previous'])
+        pages = [self.ids(page)]
+        while page['next']:
+            page = self.page(page['next'])
+            pages.append(self.ids(page))
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_previous_links(self):
+        page = self.page('/api/recipes/?limit=3&cursor=')
+        forward = [self.ids(page)]
+        while page['next']:
+            page = self.page(page['next'])
+            forward.append(self.ids(page))
+        backward = [self.ids(page)]
+        while page['previous']:
+            page = self.page(page['previous'])
+            backward.append(self.ids(page))
+        self.assertEqual(backward, forward[::-1])
+        self.assertIsNotNone(page['next'])
+
+    def test_tampered_cursor(self):
+        for cursor in (
+            'not-base64!',
+            base64.urlsafe_b64encode(b'n|yesterday|1').decode(),
+            base64.urlsafe_b64encode(b'n|2022-01-01T00:00:00|x').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+        ):
+            response = self.client.get(f'/api/recipes/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.data['detail'], 'Неверный курсор.')
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from rest_framework.authtoken.models import Token
+
+from api.nplusone import QueryBudgetExceeded
+from api.tests.base import APITestBase, create_user
+from foodgram.settings import QUERY_BUDGETS
+
+
+@mock.patch('api.nplusone.NPLUSONE_STRICT', True)
+class QueryBudgetsTest(APITestBase):
+    """
+    Каждый маршрут из QUERY_BUDGETS в строгом режиме детектора N+1:
+    превышение бюджета или повторяющиеся запросы роняют тест.
+    """
+
+    def setUp(self):
+        super().setUp()
+        authors = [self.author] + [create_user(f'author{n}') for n in range(5)]
+        with mock.patch('api.signals.schedule_renditions'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.reader.is_subscribed.add(*authors)
+            for number, author in enumerate(authors * 2):
+                self.recipe = self.create_recipe(
+                    f'Рецепт {number}', author=author,
+                    ingredients={number % 10: 10, (number + 1) % 10: 5})
+                self.recipe.is_favorited.add(self.reader)
+                self.recipe.is_in_shopping_cart.add(self.reader)
+        token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def routes(self):
+        return {
+            'GET recipes-list': '/api/recipes/',
+            'GET recipes-detail': f'/api/recipes/{self.recipe.id}/',
+            'GET recipes-feed': '/api/recipes/feed/',
+            'GET recipes-download-shopping-cart':
+                '/api/recipes/download_shopping_cart/',
+            'GET ingredients-list': '/api/ingredients/',
+            'GET ingredients-detail':
+                f'/api/ingredients/{self.ingredients[0].id}/',
+            'GET tags-list': '/api/tags/',
+            'GET tags-detail': f'/api/tags/{self.tags[0].id}/',
+            'GET users-list': '/api/users/',
+            'GET users-detail': f'/api/users/{self.author.id}/',
+            'GET users-me': '/api/users/me/',
+            'GET users-subscriptions': '/api/users/subscriptions/',
+        }
+
+    def test_budgets(self):
+        routes = self.routes()
+        self.assertEqual(routes.keys(), QUERY_BUDGETS.keys())
+        for warm in (False, True):
+            for route, url in routes.items():
+                with self.subTest(route=route, warm=warm):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_over_budget(self):
+        with mock.patch.dict(QUERY_BUDGETS, {'GET recipes-list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/recipes/')
@@ -0,0 +1,72 @@
+import base64
+import io
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from api.reference import get_reference_data
+from api.tests.base import APITestBase
+from food.models import Recipe
+
+
+def base64_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), (200, 120, 60)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+@mock.patch('api.signals.schedule_renditions')
+class RecipeCreateTest(APITestBase):
+    """POST рецепта: число запросов и ошибки валидации."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+        self.image = base64_image()
+        get_reference_data()
+
+    def post(self, name, ingredients, tags=None):
+        return self.client.post('/api/recipes/', {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': self.image,
+            'tags': tags or [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 1}
+                for ingredient_id in ingredients
+            ],
+        }, format='json')
+
+    def queries(self, name, ingredients):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(name, ingredients)
+        self.assertEqual(response.status_code, 201, response.data)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_ingredients(self, renditions):
+        ids = [ingredient.id for ingredient in self.ingredients]
+        self.assertEqual(
+            self.queries('Один ингредиент', ids[:1]),
+            self.queries('Все ингредиенты', ids))
+        self.assertEqual(
+            Recipe.objects.get(name='Все ингредиенты').recipe.count(),
+            len(ids))
+
+    def test_tag_and_ingredient_errors_together(self, renditions):
+        response = self.post('Рецепт', [9999], tags=[8888])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['tags'], ['Объектов с id 8888 не существует.'])
+        self.assertEqual(
+            response.data['non_field_errors'],
+            ['Ингредиентов с id 9999 не существует.'])
+
+    def test_ingredient_errors_alone(self, renditions):
+        response = self.post('Рецепт', [self.ingredients[0].id] * 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'non_field_errors': ['Такой ингредиент уже выбран']})
@@ -0,0 +1,103 @@
+from array import array
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from api.recipe_index import RecipeIngredientIndex
+from api.tests.base import APITestBase
+from food.models import Recipe, RecipeIngredients
+
+
+class RecipeIngredientIndexTest(APITestBase):
+    """Выборка по ингредиентам и дешёвая догрузка изменений."""
+
+    def setUp(self):
+        super().setUp()
+        self.index = RecipeIngredientIndex()
+        self.soup = self.create_recipe('Суп', ingredients={0: 1, 1: 1})
+        self.salad = self.create_recipe('Салат', ingredients={1: 1, 2: 1})
+        self.pie = self.create_recipe('Пирог', ingredients={0: 1, 3: 1})
+
+    def ids(self, *numbers):
+        return [self.ingredients[number].id for number in numbers]
+
+    def test_match(self):
+        self.assertEqual(
+            self.index.match(self.ids(0)), [self.soup.id, self.pie.id])
+        self.assertEqual(self.index.match(self.ids(0, 1)), [self.soup.id])
+        self.assertEqual(
+            self.index.match(self.ids(0), exclude=self.ids(3)),
+            [self.soup.id])
+        self.assertEqual(
+            self.index.match(self.ids(0, 1, 2), min_share=1),
+            [self.soup.id, self.salad.id])
+        self.assertEqual(
+            self.index.containing_any(self.ids(2, 3)),
+            [self.salad.id, self.pie.id])
+
+    def test_api_filter(self):
+        response = self.client.get(
+            '/api/recipes/', {'ingredients': self.ingredients[0].id,
+                              'exclude_ingredients': self.ingredients[3].id})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.soup.id])
+
+    def test_changes_are_picked_up(self):
+        self.index.refresh()
+        RecipeIngredients.objects.filter(recipe=self.pie).delete()
+        self.pie.save()
+        self.assertEqual(self.index.match(self.ids(0)), [self.soup.id])
+
+    def test_added_ingredient_keeps_postings_sorted(self):
+        self.index.refresh()
+        RecipeIngredients.objects.create(
+            recipe=self.soup, ingredients=self.ingredients[3], amount=1)
+        self.soup.save()
+        self.assertEqual(
+            self.index.match(self.ids(3)), [self.soup.id, self.pie.id])
+        self.assertEqual(
+            self.index.match(self.ids(0, 1, 3), min_share=1),
+            [self.soup.id, self.pie.id])
+
+    def test_idle_refresh_reads_nothing(self):
+        Recipe.objects.update(
+            updated_at=timezone.now() - timedelta(minutes=5))
+        self.index.refresh()
+        with mock.patch.object(self.index, '_load') as load:
+            self.index.refresh()
+        load.assert_not_called()
+
+    def test_large_refresh(self):
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=self.author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                image='food/test.png',
+                cooking_time=10,
+            )
+            for number in range(20000)
+        )
+        recipes = Recipe.objects.values_list('id', flat=True)
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe_id=recipe_id,
+                ingredients=self.ingredients[(recipe_id + shift) % 10],
+                amount=1,
+            )
+            for recipe_id in recipes.filter(name__startswith='Рецепт ')
+            for shift in range(3)
+        )
+        self.index.refresh()
+        Recipe.objects.update(updated_at=timezone.now())
+        with self.assertNumQueries(3):
+            self.index.refresh()
+        matched = self.index.match(self.ids(0))
+        for posting in self.index._postings.values():
+            self.assertIsInstance(posting, array)
+            self.assertEqual(list(posting), sorted(set(posting)))
+        self.assertEqual(matched, list(Recipe.objects.filter(
+            ingredients=self.ingredients[0]).order_by('id').values_list(
+                'id', flat=True)))
@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.reference import get_reference_data
+from api.shopping_cart import rebuild_shopping_lists
+from api.tests.base import APITestBase
+from food.models import RecipeIngredients, ShoppingList
+
+
+class RecipeUpdateTest(APITestBase):
+    """PATCH рецепта пишет только изменившиеся связи."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(
+            'Рецепт', ingredients={0: 100, 1: 2, 2: 5})
+        self.url = f'/api/recipes/{self.recipe.id}/'
+        self.client.force_authenticate(self.author)
+        get_reference_data()
+
+    def patch(self, ingredients):
+        return self.client.patch(self.url, {
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': self.ingredients[number].id, 'amount': amount}
+                for number, amount in ingredients.items()
+            ],
+        }, format='json')
+
+    def through_writes(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and ('food_recipeingredients' in query['sql']
+                 or 'food_recipe_tags' in query['sql'])
+        ]
+
+    def test_noop(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertNumQueries(12):
+                response = self.patch({0: 100, 1: 2, 2: 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.through_writes(queries), [])
+
+    def test_partial_change(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertNumQueries(17):
+                response = self.patch({0: 100, 1: 3, 3: 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [sql.split()[0] for sql in self.through_writes(queries)],
+            ['DELETE', 'INSERT', 'UPDATE'])
+        self.assertEqual(
+            dict(RecipeIngredients.objects.filter(
+                recipe=self.recipe).values_list('ingredients', 'amount')),
+            {self.ingredients[0].id: 100, self.ingredients[1].id: 3,
+             self.ingredients[3].id: 1})
+
+    def test_shopping_list_follows_patch(self):
+        self.recipe.is_in_shopping_cart.add(self.reader)
+        self.patch({0: 100, 1: 3, 3: 1})
+        self.assertEqual(rebuild_shopping_lists(fix=False), 0)
+        self.assertEqual(
+            ShoppingList.objects.get(
+                user=self.reader, ingredients=self.ingredients[1]).amount,
+            3)
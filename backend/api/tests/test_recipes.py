@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import APITestBase
+
+
+class RecipeQueriesTest(APITestBase):
+    """Число запросов списка и карточки не зависит от числа рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(8):
+            recipe = self.create_recipe(f'Рецепт {number}')
+            if number % 2:
+                recipe.is_favorited.add(self.reader)
+                recipe.is_in_shopping_cart.add(self.reader)
+        self.client.force_authenticate(self.reader)
+
+    def test_list(self):
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(
+            sum(recipe['is_favorited'] for recipe in response.data['results']),
+            3)
+
+    def test_list_count_without_subqueries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/')
+        count = [
+            query['sql'] for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(count), 1)
+        self.assertNotIn('EXISTS', count[0])
+
+    def test_list_without_count(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/?count=false')
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_list_page_size(self):
+        for number in range(50):
+            recipe = self.create_recipe(f'Ещё рецепт {number}')
+            recipe.is_favorited.add(self.reader)
+        for limit in (1, 50):
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                response = self.client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_anonymous(self):
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/recipes/')
+        self.assertFalse(response.data['results'][0]['is_favorited'])
+
+    def test_detail(self):
+        recipe = self.create_recipe(
+            'Карточка', ingredients={2: 1, 3: 2, 4: 3})
+        recipe.is_favorited.add(self.reader)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+        self.assertEqual(len(response.data['ingredients']), 3)
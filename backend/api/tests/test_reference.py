@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from api import reference
+from api.reference import (VERSION_KEY, bump_version, get_reference_data,
+                           get_version)
+from api.tests.base import TEST_CACHES, APITestBase
+
+
+class ReferenceSnapshotTest(APITestBase):
+
+    def test_snapshot_without_queries_or_cache_reads(self):
+        get_reference_data()
+        with mock.patch.object(
+                caches['versions'], 'get') as cache_get, \
+                self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertEqual(len(get_reference_data().tags), 3)
+        cache_get.assert_not_called()
+
+    def test_version_from_other_process_after_interval(self):
+        snapshot = get_reference_data()
+        caches['versions'].set(VERSION_KEY, 'other', None)
+        self.assertIs(get_reference_data(), snapshot)
+        with mock.patch.object(reference, '_checked_at', 0.0), \
+                mock.patch('api.reference.time.monotonic',
+                           return_value=10 ** 6):
+            self.assertEqual(get_version(), 'other')
+            self.assertEqual(get_reference_data().version, 'other')
+
+    def test_lost_version_key_invalidates_snapshot(self):
+        snapshot = get_reference_data()
+        caches['versions'].delete(VERSION_KEY)
+        with mock.patch.object(reference, '_checked_at', 0.0), \
+                mock.patch('api.reference.time.monotonic',
+                           return_value=10 ** 6):
+            self.assertIsNotNone(get_version())
+            self.assertNotEqual(get_version(), snapshot.version)
+            self.assertIsNot(get_reference_data(), snapshot)
+        self.assertEqual(
+            caches['versions'].get(VERSION_KEY), get_version())
+
+
+class BumpVersionTest(SimpleTestCase):
+
+    def test_bump_is_visible_in_this_process_at_once(self):
+        with self.settings(CACHES=TEST_CACHES):
+            before = get_version()
+            bump_version()
+            self.assertNotEqual(get_version(), before)
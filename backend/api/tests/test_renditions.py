@@ -0,0 +1,73 @@
+import io
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from api.tests.base import APITestBase
+from food.renditions import make_renditions, rendition_name
+
+
+def save_image(name):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 120, 60)).save(buffer, 'PNG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+class RenditionsTest(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe('Рецепт')
+        self.recipe.image = save_image('food/first.png')
+        self.recipe.save()
+
+    def renditions(self):
+        return self.client.get(
+            f'/api/recipes/{self.recipe.id}/').data['image_renditions']
+
+    def renditions_exist(self, image_name):
+        return [
+            default_storage.exists(rendition_name(image_name, rendition))
+            for rendition in ('small', 'medium')
+        ]
+
+    def test_original_until_renditions_exist(self):
+        image_url = 'http://testserver' + self.recipe.image.url
+        self.assertEqual(set(self.renditions().values()), {image_url})
+        make_renditions(self.recipe.image.name)
+        self.assertTrue(all(
+            url.endswith('.webp') for url in self.renditions().values()))
+
+    @mock.patch('api.signals.schedule_renditions')
+    def test_replaced_and_deleted_image(self, schedule_renditions):
+        first = self.recipe.image.name
+        make_renditions(first)
+        self.recipe.image = save_image('food/second.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        schedule_renditions.assert_called_once_with(self.recipe.image.name)
+        self.assertEqual(self.renditions_exist(first), [False, False])
+
+        second = self.recipe.image.name
+        make_renditions(second)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertEqual(self.renditions_exist(second), [False, False])
+
+    @mock.patch('api.signals.schedule_renditions')
+    def test_plain_save_keeps_renditions(self, schedule_renditions):
+        make_renditions(self.recipe.image.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        schedule_renditions.assert_not_called()
+        self.assertEqual(
+            self.renditions_exist(self.recipe.image.name), [True, True])
+
+    def test_serialization_skips_storage(self):
+        make_renditions(self.recipe.image.name)
+        with mock.patch.object(default_storage, 'exists') as exists:
+            self.assertTrue(all(
+                url.endswith('.webp') for url in self.renditions().values()))
+        exists.assert_not_called()
@@ -0,0 +1,43 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from api.tests.base import APITestBase
+from food.models import Recipe
+
+
+class RecipeSearchTest(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_recipe('Грибной суп')
+        self.create_recipe('Салат')
+        text_match = self.create_recipe('Пирог')
+        text_match.text = 'Начинка из грибов и лука'
+        text_match.save()
+        self.create_recipe('Котлеты')
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_name_ranks_above_text(self):
+        names = self.search('гриб')
+        self.assertEqual(names[0], 'Грибной суп')
+        self.assertNotIn('Салат', names)
+
+    def test_no_match(self):
+        self.assertEqual(self.search('борщ'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'tsvector needs PostgreSQL')
+    def test_postgresql_morphology_and_index(self):
+        self.assertTrue(Recipe.objects.filter(
+            name='Пирог', search_vector__isnull=False).exists())
+        self.assertEqual(self.search('грибы'), ['Пирог'])
+        self.assertEqual(self.search('котлета'), ['Котлеты'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT indexdef FROM pg_indexes WHERE indexname = %s',
+                ('recipe_search_vector_gin',))
+            self.assertIn('USING gin', cursor.fetchone()[0])
@@ -0,0 +1,113 @@
+from api.shopping_cart import rebuild_shopping_lists
+from api.tests.base import APITestBase, create_user
+from food.models import Recipe, RecipeIngredients, ShoppingList
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartDownloadTest(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe('Рецепт', ingredients={0: 100, 1: 2})
+        self.recipe.is_in_shopping_cart.add(self.reader)
+        self.client.force_authenticate(self.reader)
+
+    def test_download_streams_rows(self):
+        response = self.client.get(DOWNLOAD_URL + '?format=txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Ингредиент 0: 100 г', content)
+        self.assertTrue(response['ETag'])
+
+    def test_not_modified_keeps_etag(self):
+        etag = self.client.get(DOWNLOAD_URL + '?format=csv')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                DOWNLOAD_URL + '?format=csv', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_cart(self):
+        etag = self.client.get(DOWNLOAD_URL + '?format=json')['ETag']
+        other = self.create_recipe('Другой', ingredients={1: 3})
+        other.is_in_shopping_cart.add(self.reader)
+        response = self.client.get(
+            DOWNLOAD_URL + '?format=json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_empty_cart(self):
+        self.recipe.is_in_shopping_cart.remove(self.reader)
+        response = self.client.get(DOWNLOAD_URL + '?format=txt')
+        self.assertEqual(response.status_code, 400)
+
+
+class ShoppingListSignalsTest(APITestBase):
+    """Список покупок следует за изменениями корзины и состава через ORM."""
+
+    def setUp(self):
+        super().setUp()
+        self.soup = self.create_recipe('Суп', ingredients={0: 100, 1: 2})
+        self.pie = self.create_recipe('Пирог', ingredients={1: 3})
+        self.other = create_user('other')
+
+    def amounts(self, user):
+        return {
+            name: amount
+            for name, amount in ShoppingList.objects.filter(
+                user=user).values_list('ingredients__name', 'amount')
+        }
+
+    def assertInSync(self):
+        self.assertEqual(rebuild_shopping_lists(fix=False), 0)
+
+    def test_cart_add_remove_clear(self):
+        self.soup.is_in_shopping_cart.add(self.reader, self.other)
+        self.reader.is_in_shopping_cart.add(self.pie)
+        self.assertEqual(
+            self.amounts(self.reader),
+            {'Ингредиент 0': 100, 'Ингредиент 1': 5})
+        self.soup.is_in_shopping_cart.remove(self.reader)
+        self.soup.is_in_shopping_cart.remove(self.reader)
+        self.assertEqual(self.amounts(self.reader), {'Ингредиент 1': 3})
+        self.assertInSync()
+        self.reader.is_in_shopping_cart.clear()
+        self.soup.is_in_shopping_cart.clear()
+        self.assertEqual(ShoppingList.objects.count(), 0)
+        self.assertInSync()
+        self.soup.refresh_from_db()
+        self.assertEqual(self.soup.shopping_cart_count, 0)
+
+    def test_ingredient_rows(self):
+        self.soup.is_in_shopping_cart.add(self.reader)
+        row = RecipeIngredients.objects.get(
+            recipe=self.soup, ingredients=self.ingredients[0])
+        row.amount = 150
+        row.save()
+        row.ingredients = self.ingredients[2]
+        row.save()
+        RecipeIngredients.objects.create(
+            recipe=self.soup, ingredients=self.ingredients[3], amount=1)
+        RecipeIngredients.objects.get(
+            recipe=self.soup, ingredients=self.ingredients[1]).delete()
+        self.assertEqual(
+            self.amounts(self.reader),
+            {'Ингредиент 2': 150, 'Ингредиент 3': 1})
+        self.assertInSync()
+
+    def test_recipe_and_ingredient_deleted(self):
+        self.soup.is_in_shopping_cart.add(self.reader)
+        self.pie.is_in_shopping_cart.add(self.reader)
+        Recipe.objects.filter(pk=self.soup.pk).delete()
+        self.assertEqual(self.amounts(self.reader), {'Ингредиент 1': 3})
+        self.ingredients[1].delete()
+        self.assertEqual(self.amounts(self.reader), {})
+        self.assertInSync()
+
+    def test_rebuild_in_batches(self):
+        self.soup.is_in_shopping_cart.add(self.reader, self.other)
+        ShoppingList.objects.update(amount=1)
+        self.assertEqual(rebuild_shopping_lists(batch_size=1), 4)
+        self.assertInSync()
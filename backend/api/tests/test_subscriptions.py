@@ -0,0 +1,40 @@
+from unittest import mock
+
+from api.tests.base import APITestBase, create_user
+
+
+class SubscriptionsTest(APITestBase):
+    """recipes_limit ограничивает рецепты, но не recipes_count."""
+
+    def setUp(self):
+        super().setUp()
+        self.other = create_user('other')
+        with mock.patch('api.signals.schedule_renditions'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.recipes = [
+                self.create_recipe(f'Рецепт {number}') for number in range(5)]
+            self.create_recipe('Чужой рецепт', author=self.other)
+            self.reader.is_subscribed.add(self.author, self.other)
+        self.client.force_authenticate(self.reader)
+
+    def test_recipes_limit(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 3})
+        self.assertEqual(response.status_code, 200)
+        authors = {
+            author['id']: author for author in response.data['results']}
+        author = authors[self.author.id]
+        self.assertEqual(author['recipes_count'], 5)
+        self.assertEqual(
+            [recipe['id'] for recipe in author['recipes']],
+            [recipe.id for recipe in reversed(self.recipes)][:3])
+        other = authors[self.other.id]
+        self.assertEqual(other['recipes_count'], 1)
+        self.assertEqual(len(other['recipes']), 1)
+
+    def test_without_limit(self):
+        response = self.client.get('/api/users/subscriptions/')
+        author = {
+            author['id']: author for author in response.data['results']
+        }[self.author.id]
+        self.assertEqual(len(author['recipes']), 5)
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from api.tests.base import TEST_CACHES, APITestBase, create_user
+from food.models import Recipe
+
+
+class ToggleTest(APITestBase):
+    """Добавление в избранное одним запросом."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe('Рецепт')
+        self.client.force_authenticate(self.reader)
+
+    def test_not_numeric_pk(self):
+        for pk in ('abc', '1.5', str(2 ** 64)):
+            with self.subTest(pk=pk):
+                response = self.client.post(f'/api/recipes/{pk}/favorite/')
+                self.assertEqual(response.status_code, 404)
+
+    def test_add_twice(self):
+        url = f'/api/recipes/{self.recipe.id}/favorite/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConcurrentToggleTest(APITransactionTestCase):
+    """Параллельные одинаковые запросы дают одну строку и верный счётчик."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'SQLite в памяти не пускает параллельные записи, '
+                'задайте DB_TEST_NAME')
+        self.user = create_user('reader')
+        with mock.patch('api.signals.schedule_renditions'):
+            self.recipe = Recipe.objects.create(
+                author=create_user('author'),
+                name='Рецепт',
+                text='Описание',
+                image='food/test.png',
+                cooking_time=10,
+            )
+
+    def request(self, method):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return getattr(client, method)(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/').status_code
+        finally:
+            connection.close()
+
+    def run_parallel(self, method, count=8):
+        with ThreadPoolExecutor(count) as executor:
+            return sorted(executor.map(self.request, [method] * count))
+
+    def test_parallel_add_and_remove(self):
+        self.assertEqual(self.run_parallel('post'), [201] + [400] * 7)
+        self.assertEqual(self.recipe.is_in_shopping_cart.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.shopping_cart_count, 1)
+        self.assertEqual(self.run_parallel('delete'), [204] + [400] * 7)
+        self.assertFalse(self.recipe.is_in_shopping_cart.exists())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.shopping_cart_count, 0)
@@ -1,11 +1,13 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import asyncify
 from api.views import (
     IngredientsViewSet,
     RecipesViewSet,
     TagViewSet,
 )
+from foodgram.settings import ASGI_MODE, JWT_AUTH
 from users.views import UserViewSet
 
 app_name = 'api'
@@ -15,7 +17,11 @@ router.register('recipes', RecipesViewSet, basename='recipes')
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientsViewSet, basename='ingredients')
 
-urlpatterns = (
-    path('', include(router.urls)),
+urlpatterns = [
+    path('', include(
+        asyncify(router.urls) if ASGI_MODE else router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
-)
+]
+
+if JWT_AUTH:
+    urlpatterns.append(path('auth/', include('djoser.urls.jwt')))
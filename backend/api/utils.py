@@ -1,12 +1,140 @@
-from datetime import datetime
+import csv
+import hashlib
+import io
+import json
 
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.http import (Http404, HttpResponseNotModified,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
 
-from food.models import RecipeIngredients
+from api.counters import M2M_COUNTERS, change_counter
+from api.feed import subscribed, unsubscribed
+from api.shopping_cart import add_to_cart, remove_from_cart
+from food.models import Recipe, ShoppingList
+from foodgram.settings import BULK_IDS_MAX
+from users.models import CustomUser
+
+
+M2M_DATASETS = {
+    'is_subscribed': (
+        CustomUser.is_subscribed.through, 'from_customuser', 'to_customuser'),
+    'is_in_shopping_cart': (
+        Recipe.is_in_shopping_cart.through, 'customuser', 'recipe'),
+    'is_favorited': (Recipe.is_favorited.through, 'customuser', 'recipe'),
+}
+
+# Наибольший id BigAutoField.
+MAX_ID = 2 ** 63 - 1
+
+
+def object_id(pk):
+    """id объекта из URL; не число или вне диапазона id - 404."""
+    pk = str(pk)
+    if not pk.isdecimal() or int(pk) > MAX_ID:
+        raise Http404
+    return int(pk)
+
+
+def link(through, user_field, obj_field, target, user_id, pk):
+    """
+    Создаёт связь одним INSERT, если объект существует и связи ещё нет.
+    Возвращает True, если строка вставлена.
+    """
+    pk = int(pk)
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        if not target.objects.filter(id=pk).exists():
+            return False
+        _, created = through.objects.get_or_create(**{
+            f'{user_field}_id': user_id, f'{obj_field}_id': pk})
+        return created
+    quote = connection.ops.quote_name
+    user_column = through._meta.get_field(user_field).column
+    obj_column = through._meta.get_field(obj_field).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(through._meta.db_table)} '
+            f'({quote(user_column)}, {quote(obj_column)}) '
+            f'SELECT %s, {quote(target._meta.pk.column)} '
+            f'FROM {quote(target._meta.db_table)} '
+            f'WHERE {quote(target._meta.pk.column)} = %s '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(obj_column)}',
+            (user_id, pk)
+        )
+        return cursor.fetchone() is not None
+
+
+def link_many(through, user_field, obj_field, target, user_id, pks):
+    """
+    Создаёт связи с существующими объектами из pks одним INSERT,
+    пропуская уже существующие. Возвращает id вставленных объектов.
+    """
+    if not pks:
+        return set()
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        found = set(target.objects.filter(
+            id__in=pks).values_list('id', flat=True))
+        existing = set(through.objects.filter(**{
+            user_field: user_id, f'{obj_field}__in': found
+        }).values_list(obj_field, flat=True))
+        through.objects.bulk_create(
+            [
+                through(**{f'{user_field}_id': user_id, f'{obj_field}_id': pk})
+                for pk in found - existing
+            ],
+            ignore_conflicts=True
+        )
+        return found - existing
+    quote = connection.ops.quote_name
+    user_column = through._meta.get_field(user_field).column
+    obj_column = through._meta.get_field(obj_field).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(through._meta.db_table)} '
+            f'({quote(user_column)}, {quote(obj_column)}) '
+            f'SELECT %s, {quote(target._meta.pk.column)} '
+            f'FROM {quote(target._meta.db_table)} '
+            f'WHERE {quote(target._meta.pk.column)} IN '
+            f'({", ".join(["%s"] * len(pks))}) '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(obj_column)}',
+            (user_id, *pks)
+        )
+        return {pk for pk, in cursor.fetchall()}
+
+
+def unlink_many(through, user_field, obj_field, user_id, pks):
+    """Удаляет связи с объектами из pks. Возвращает id удалённых."""
+    if not pks:
+        return set()
+    linked = through.objects.filter(
+        **{user_field: user_id, f'{obj_field}__in': pks})
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        existing = set(linked.select_for_update().values_list(
+            obj_field, flat=True))
+        linked.delete()
+        return existing
+    quote = connection.ops.quote_name
+    user_column = through._meta.get_field(user_field).column
+    obj_column = through._meta.get_field(obj_field).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(through._meta.db_table)} '
+            f'WHERE {quote(user_column)} = %s AND {quote(obj_column)} IN '
+            f'({", ".join(["%s"] * len(pks))}) '
+            f'RETURNING {quote(obj_column)}',
+            (user_id, *pks)
+        )
+        return {pk for pk, in cursor.fetchall()}
+
+
+def unlink(through, user_field, obj_field, target, user_id, pk):
+    """Удаляет связь одним DELETE. Возвращает True, если она была."""
+    deleted, _ = through.objects.filter(**{
+        user_field: user_id, obj_field: int(pk)}).delete()
+    return bool(deleted)
 
 
 class FilterDataset:
@@ -16,53 +144,181 @@ class FilterDataset:
     FAVORITE = 'is_favorited'
 
     def obj_favorite_cart_subscribe(self, request, pk, method_date):
-        """Работает со списком избранных."""
+        """
+        Работает со списком избранных: одна запись INSERT ... ON CONFLICT
+        или DELETE ... RETURNING, гонки параллельных запросов сходятся.
+        """
         user = self.request.user
         if user.is_anonymous:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
-        dataset = {
-            'is_subscribed': user.is_subscribed,
-            'is_in_shopping_cart': user.is_in_shopping_cart,
-            'is_favorited': user.is_favorited,
-        }
-        data = dataset[method_date]
-        obj = get_object_or_404(self.queryset, id=pk)
-        serializer = self.serializer_class(
-            obj, context={'request': self.request})
-        obj_exist = data.filter(id=pk).exists()
-        if (self.request.method in ('GET', 'POST',)) and not obj_exist:
-            data.add(obj)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        if (self.request.method in ('DELETE',)) and obj_exist:
-            data.remove(obj)
+        pk = object_id(pk)
+        through, user_field, obj_field = M2M_DATASETS[method_date]
+        model, field = M2M_COUNTERS[through][:2]
+        adding = self.request.method in ('GET', 'POST',)
+        if method_date == self.SUBSCRIBE and adding and pk == user.id:
+            return Response(
+                data={'errors': 'Нельзя подписаться на самого себя.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        toggle = link if adding else unlink
+        with transaction.atomic():
+            changed = toggle(
+                through, user_field, obj_field, self.queryset.model,
+                user.id, pk)
+            if changed:
+                change_counter(model, field, (pk,), 1 if adding else -1)
+                if method_date == self.CART:
+                    (add_to_cart if adding else remove_from_cart)(
+                        user, (pk,))
+                if method_date == self.SUBSCRIBE:
+                    (subscribed if adding else unsubscribed)(
+                        user.id, (pk,))
+        if not changed:
+            get_object_or_404(self.queryset, id=pk)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if not adding:
             return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.serializer_class(
+            self.queryset.get(id=pk), context={'request': self.request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def download_shopping_cart_txt(self, request):
-        """Загружает файл *.txt со списком покупок."""
+    def bulk_favorite_cart_subscribe(self, request, method_date):
+        """
+        Добавляет (POST) или удаляет (DELETE) сразу несколько объектов
+        из {"ids": [...]} одним INSERT ... ON CONFLICT DO NOTHING RETURNING
+        или DELETE ... RETURNING: счётчики меняются только по строкам,
+        которые действительно вставил или удалил этот запрос.
+        Больше BULK_IDS_MAX id за запрос не принимается.
+        """
         user = self.request.user
+        ids = request.data.get('ids')
+        if (not isinstance(ids, list)
+                or not all(isinstance(pk, int) and not isinstance(pk, bool)
+                           for pk in ids)):
+            return Response(
+                data={'ids': ['Ожидается список id.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > BULK_IDS_MAX:
+            return Response(
+                data={'ids': [f'Не больше {BULK_IDS_MAX} id за запрос.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if method_date == self.SUBSCRIBE and user.id in ids:
+            return Response(
+                data={'ids': ['Нельзя подписаться на самого себя.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = sorted(set(ids))
+        through, user_field, obj_field = M2M_DATASETS[method_date]
+        model, field = M2M_COUNTERS[through][:2]
+        with transaction.atomic():
+            if self.request.method == 'POST':
+                changed = sorted(link_many(
+                    through, user_field, obj_field, self.queryset.model,
+                    user.id, ids))
+                delta = 1
+            else:
+                changed = sorted(unlink_many(
+                    through, user_field, obj_field, user.id, ids))
+                delta = -1
+            change_counter(model, field, changed, delta)
+            if method_date == self.CART and changed:
+                if delta > 0:
+                    add_to_cart(user, changed)
+                else:
+                    remove_from_cart(user, changed)
+            if method_date == self.SUBSCRIBE and changed:
+                if delta > 0:
+                    subscribed(user.id, changed)
+                else:
+                    unsubscribed(user.id, changed)
+        found = set(changed) | set(self.queryset.filter(
+            id__in=set(ids) - set(changed)).values_list('id', flat=True))
+        return Response({
+            'changed': changed,
+            'unchanged': sorted(found - set(changed)),
+            'not_found': sorted(set(ids) - found),
+        })
 
-        if not user.is_in_shopping_cart.exists():
+    def shopping_cart_rows(self, user):
+        """Сводный список ингредиентов из сохранённого списка покупок."""
+        return ShoppingList.objects.filter(
+            user=user
+        ).values_list(
+            'ingredients__name',
+            'ingredients__measurement_unit',
+            'amount',
+        ).order_by('ingredients__name', 'ingredients__measurement_unit')
+
+    def download_shopping_cart_file(self, request):
+        """
+        Отдаёт список покупок потоком в формате txt, csv или json.
+        ETag считается по числу строк и времени последнего изменения
+        списка, поэтому для 304 строки списка не читаются.
+        """
+        user = self.request.user
+        version = ShoppingList.objects.filter(user=user).aggregate(
+            count=Count('id'), updated_at=Max('updated_at'))
+        if not version['count']:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        ingredients = RecipeIngredients.objects.filter(
-            recipe__in=(user.is_in_shopping_cart.values('id'))
-        ).values(
-            ingredient=F('ingredients__name'),
-            measurement_unit=F('ingredients__measurement_unit')).annotate(
-            amount=Sum('amount')
-        )
-        filename = f'{user.username}_shopping_list.txt'
-        shopping_list = (
-            f'Список покупок для: {user.first_name}\n\n'
-            f'{datetime.now().strftime(" shopping_cart. ")}'
-        )
-        for ing in ingredients:
-            shopping_list += (
-                f'{ing["ingredient"]}: '
-                f'{ing["amount"]} {ing["measurement_unit"]}')
-        response = HttpResponse(
-            shopping_list, content_type='text.txt; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
+        file_format = request.accepted_renderer.format
+        etag = '"{}"'.format(hashlib.md5('{}:{}:{}:{}'.format(
+            file_format, user.first_name, version['count'],
+            version['updated_at'].isoformat()
+        ).encode()).hexdigest())
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            filename = f'{user.username}_shopping_list.{file_format}'
+            response = StreamingHttpResponse(
+                SHOPPING_LIST_WRITERS[file_format](
+                    user, self.shopping_cart_rows(user).iterator()),
+                content_type=(
+                    f'{request.accepted_renderer.media_type}; charset=utf-8')
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename={filename}')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         return response
+
+
+def shopping_list_txt(user, rows):
+    """Строки текстового списка покупок."""
+    yield f'Список покупок для: {user.first_name}\n\n'
+    for name, measurement_unit, amount in rows:
+        yield f'{name}: {amount} {measurement_unit}\n'
+
+
+def shopping_list_csv(user, rows):
+    """Строки списка покупок в формате csv."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('ingredient', 'amount', 'measurement_unit'))
+    for name, measurement_unit, amount in rows:
+        writer.writerow((name, amount, measurement_unit))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def shopping_list_json(user, rows):
+    """Список покупок в формате json, по одному объекту за раз."""
+    yield '['
+    for index, (name, measurement_unit, amount) in enumerate(rows):
+        item = json.dumps({
+            'ingredient': name,
+            'amount': amount,
+            'measurement_unit': measurement_unit,
+        }, ensure_ascii=False)
+        yield f',\n{item}' if index else f'\n{item}'
+    yield '\n]\n'
+
+
+SHOPPING_LIST_WRITERS = {
+    'txt': shopping_list_txt,
+    'csv': shopping_list_csv,
+    'json': shopping_list_json,
+}
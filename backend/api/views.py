@@ -1,20 +1,28 @@
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientsFilter, RecipesFilter
-from api.pagination import CustomPagination
+from api.autocomplete import ingredient_index
+from api.filters import RecipesFilter
+from api.pagination import FeedPagination, RecipePagination
+from api.parsers import ImageUploadParser
+from api.reference import get_reference_data, get_reference_object
+from api.renderers import SHOPPING_LIST_RENDERERS
 from api.permissions import AdminOnly, ReadOnly, AuthorOrReadOnly
 from api.serializers import (
     CreateRecipeSerializer,
     IngredientsSerializer,
     ListRecipeSerializer,
+    RecipeImageSerializer,
     TagSerializer, SubscriptionsRecipeSerializer
 )
 from api.utils import FilterDataset
-from food.models import Ingredients, Recipe, Tag
+from food.models import Ingredients, Recipe, RecipeIngredients, Tag
+from users.models import CustomUser
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -22,26 +30,47 @@ class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [ReadOnly | AdminOnly]
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
     lookup_field = 'id'
     # slug
 
+    def list(self, request, *args, **kwargs):
+        """Тэги из снимка справочников, ?search= по названию."""
+        tags = get_reference_data().tags
+        search = request.query_params.get('search', '').strip().casefold()
+        if search:
+            tags = [tag for tag in tags if search in tag.name.casefold()]
+        return Response(self.get_serializer(tags, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Тэг из снимка справочников."""
+        return Response(self.get_serializer(
+            get_reference_object('tags_by_id', kwargs['id'])).data)
+
 
 class IngredientsViewSet(viewsets.ModelViewSet):
     """Возвращает из БД и создает ингридиенты"""
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
     permission_classes = [ReadOnly | AdminOnly]
-    filter_backends = (DjangoFilterBackend, )
-    filterset_class = IngredientsFilter
+
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по названию из индекса в памяти процесса."""
+        name = request.query_params.get('name')
+        if name is None:
+            return Response(ingredient_index.all())
+        return Response(ingredient_index.search(name))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Ингредиент из снимка справочников."""
+        return Response(self.get_serializer(
+            get_reference_object('ingredients_by_id', kwargs['pk'])).data)
 
 
 class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
     """Возвращает из БД и создает рецепты"""
     queryset = Recipe.objects.all()
     permission_classes = [AuthorOrReadOnly | AdminOnly]
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipesFilter
     serializer_class = SubscriptionsRecipeSerializer
@@ -49,6 +78,8 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
     def get_queryset(self):
         queryset = self.queryset
         user = self.request.user
+        if self.action == 'retrieve':
+            queryset = self.annotate_queryset(queryset, user)
         if user.is_anonymous:
             return queryset
 
@@ -66,6 +97,50 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
 
         return queryset
 
+    def prepare_page(self, queryset):
+        """Флаги и связи только для рецептов страницы (см. пагинацию)."""
+        return self.annotate_queryset(queryset, self.request.user)
+
+    def reload(self, instance):
+        """Перечитывает сохранённый рецепт со всеми связями для ответа."""
+        return self.annotate_queryset(
+            self.queryset.filter(id=instance.id), self.request.user).get()
+
+    @staticmethod
+    def annotate_queryset(queryset, user):
+        """
+        Загружает страницу рецептов фиксированным числом запросов:
+        флаги избранного, корзины и подписки считаются подзапросами,
+        тэги, ингридиенты и авторы подгружаются одним запросом на связь.
+        """
+        if user.is_anonymous:
+            favorited = in_shopping_cart = subscribed = Value(
+                False, output_field=BooleanField())
+        else:
+            favorited = Exists(Recipe.is_favorited.through.objects.filter(
+                recipe=OuterRef('pk'), customuser=user.id))
+            in_shopping_cart = Exists(
+                Recipe.is_in_shopping_cart.through.objects.filter(
+                    recipe=OuterRef('pk'), customuser=user.id))
+            subscribed = Exists(
+                CustomUser.is_subscribed.through.objects.filter(
+                    from_customuser=user.id, to_customuser=OuterRef('pk')))
+        return queryset.annotate(
+            favorited=favorited,
+            in_shopping_cart=in_shopping_cart,
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'author',
+                queryset=CustomUser.objects.annotate(subscribed=subscribed)
+            ),
+            Prefetch(
+                'recipe',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredients').order_by('ingredients__name')
+            ),
+        )
+
     def get_serializer_class(self):
         if self.request.method in ['GET']:
             return ListRecipeSerializer
@@ -82,7 +157,7 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
         serializer.is_valid(raise_exception=True)
         instance = self.perform_create(serializer)
         serializer = ListRecipeSerializer(
-            instance,
+            self.reload(instance),
             context={'request': self.request}
         )
         headers = self.get_success_headers(serializer.data)
@@ -103,7 +178,7 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
         serializer.is_valid(raise_exception=True)
         instance = self.perform_update(serializer)
         serializer = ListRecipeSerializer(
-            instance,
+            self.reload(instance),
             context={'request': self.request}
         )
 
@@ -112,6 +187,45 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
 
         return Response(serializer.data)
 
+    @action(
+        methods=('GET',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='feed'
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        paginator = FeedPagination()
+        page = paginator.paginate_queryset(
+            self.queryset, request, view=self)
+        serializer = ListRecipeSerializer(
+            page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('PUT',),
+        detail=True,
+        parser_classes=(MultiPartParser, ImageUploadParser),
+        url_path='image'
+    )
+    def image(self, request, pk):
+        """
+        Загружает картинку рецепта без base64: multipart или телом запроса.
+        Имя файла в Content-Disposition необязательно.
+        """
+        instance = self.get_object()
+        serializer = RecipeImageSerializer(
+            instance,
+            data={'image': request.data.get('image', request.data.get('file'))}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        serializer = ListRecipeSerializer(
+            instance,
+            context={'request': self.request}
+        )
+        return Response(serializer.data)
+
     @action(
         methods=('POST', 'DELETE'),
         detail=True,
@@ -132,12 +246,35 @@ class RecipesViewSet(viewsets.ModelViewSet, FilterDataset):
         """Работает со списком покупок."""
         return self.obj_favorite_cart_subscribe(request, pk, self.CART)
 
+    @action(
+        methods=('POST', 'DELETE'),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite',
+        url_name='favorite-bulk'
+    )
+    def favorite_bulk(self, request):
+        """Добавляет или удаляет из избранного сразу несколько рецептов."""
+        return self.bulk_favorite_cart_subscribe(request, self.FAVORITE)
+
+    @action(
+        methods=('POST', 'DELETE'),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk'
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавляет или удаляет из списка покупок сразу несколько рецептов."""
+        return self.bulk_favorite_cart_subscribe(request, self.CART)
+
     @action(
         methods=['GET'],
         detail=False,
         permission_classes=[IsAuthenticated, ],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
         url_path='download_shopping_cart'
     )
     def download_shopping_cart(self, request):
-        """Загружает файл *.txt со списком покупок."""
-        return self.download_shopping_cart_txt(request)
+        """Загружает файл со списком покупок, ?format=txt|csv|json."""
+        return self.download_shopping_cart_file(request)
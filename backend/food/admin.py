@@ -1,5 +1,6 @@
 from django.contrib.admin import ModelAdmin, TabularInline, register, site
-from food.models import Ingredients, Recipe, RecipeIngredients, Tag
+from food.models import (FeedEntry, Ingredients, Recipe, RecipeIngredients,
+                         ShoppingList, Tag)
 
 site.site_header = 'Администрирование Foodgram'
 EMPTY_VALUE_DISPLAY = 'Значение не указано'
@@ -35,7 +36,7 @@ class IngredientAdmin(ModelAdmin):
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
     list_display = (
-        'id', 'name', 'author', 'pub_date', 'count_in_favourites'
+        'id', 'name', 'author', 'pub_date', 'favorites_count'
     )
     fields = (
         ('name', 'cooking_time',),
@@ -59,11 +60,6 @@ class RecipeAdmin(ModelAdmin):
     save_on_top = True
     empty_value_display = EMPTY_VALUE_DISPLAY
 
-    def count_in_favourites(self, obj):
-        return obj.is_favorited.all().count()
-
-    count_in_favourites.short_description = 'Общее число в избранном.'
-
 
 @register(Tag)
 class TagAdmin(ModelAdmin):
@@ -77,3 +73,29 @@ class TagAdmin(ModelAdmin):
 
     save_on_top = True
     empty_value_display = EMPTY_VALUE_DISPLAY
+
+
+@register(ShoppingList)
+class ShoppingListAdmin(ModelAdmin):
+    list_display = (
+        'user', 'ingredients', 'amount',
+    )
+    raw_id_fields = ('user', 'ingredients',)
+    search_fields = (
+        'user__username',
+    )
+
+    empty_value_display = EMPTY_VALUE_DISPLAY
+
+
+@register(FeedEntry)
+class FeedEntryAdmin(ModelAdmin):
+    list_display = (
+        'user', 'recipe', 'pub_date',
+    )
+    raw_id_fields = ('user', 'recipe',)
+    search_fields = (
+        'user__username',
+    )
+
+    empty_value_display = EMPTY_VALUE_DISPLAY
@@ -0,0 +1,260 @@
+import json
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+
+from food.models import Ingredients, Recipe
+from foodgram.handlers import APIWSGIHandler
+from foodgram.settings import PAGE_SIZE
+from users.models import CustomUser
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe}/',
+    '/api/ingredients/?name=а',
+)
+
+MIX = (
+    ('recipes-list', 35),
+    ('recipes-list-page', 10),
+    ('recipes-detail', 20),
+    ('ingredients-search', 20),
+    ('users-subscriptions', 10),
+    ('download-shopping-cart', 5),
+)
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированному списку."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def fetch(url, headers, timeout):
+    """Один запрос: (время в секундах, код ответа или None)."""
+    started = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as r:
+            r.read()
+            status = r.status
+    except HTTPError as error:
+        status = error.code
+    except (URLError, OSError):
+        status = None
+    return time.perf_counter() - started, status
+
+
+def summary(results, elapsed):
+    """Пропускная способность и перцентили задержки в миллисекундах."""
+    latencies = sorted(seconds for seconds, _ in results)
+    return {
+        'requests': len(results),
+        'errors': sum(
+            1 for _, status in results if status is None or status >= 500),
+        'rps': round(len(results) / elapsed, 1),
+        'p50': round(percentile(latencies, 0.5) * 1000, 1),
+        'p90': round(percentile(latencies, 0.9) * 1000, 1),
+        'p99': round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent HTTP load against a running server: given paths or '
+        'a realistic request mix, reports throughput and latency '
+        'percentiles, optionally as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Server base url',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Path to request, may be repeated; '
+                 '{recipe} is replaced with --recipe',
+        )
+        parser.add_argument('--recipe', type=int, default=1)
+        parser.add_argument('--token', help='Auth token for the requests')
+        parser.add_argument(
+            '--mix',
+            action='store_true',
+            help='Replay a weighted mix of list, detail, ingredient '
+                 'search, subscriptions and shopping list downloads '
+                 'as users from this database',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Number of users the mix authenticates as',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per path, or in total for --mix',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Write results to a JSON file')
+        parser.add_argument(
+            '--compare',
+            help='JSON file of a previous run to compare p50/p99 with',
+        )
+        parser.add_argument(
+            '--in-process',
+            action='store_true',
+            help='Call the full MIDDLEWARE handler and the API_MIDDLEWARE '
+                 'handler in this process, one request at a time, '
+                 'instead of going over HTTP',
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        if options['in_process']:
+            report = self.run_in_process(base_url, options)
+        elif options['mix']:
+            report = self.run([self.mix_jobs(base_url, options)], options)
+        else:
+            headers = {}
+            if options['token']:
+                headers['Authorization'] = f'Token {options["token"]}'
+            report = self.run([
+                [(path, base_url + path.format(recipe=options['recipe']),
+                  headers)] * options['requests']
+                for path in options['paths'] or DEFAULT_PATHS
+            ], options)
+        self.print_report(report, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'url': base_url,
+                    'mix': options['mix'],
+                    'in_process': options['in_process'],
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'seed': options['seed'],
+                    'results': report,
+                }, file, ensure_ascii=False, indent=2)
+
+    def run(self, batches, options):
+        """Выполняет пачки запросов, сводка по имени сценария."""
+        report = {}
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            for jobs in batches:
+                started = time.perf_counter()
+                results = list(pool.map(
+                    lambda job: (job[0], fetch(
+                        job[1], job[2], options['timeout'])),
+                    jobs
+                ))
+                elapsed = time.perf_counter() - started
+                grouped = defaultdict(list)
+                for name, result in results:
+                    grouped[name].append(result)
+                for name, group in grouped.items():
+                    report[name] = summary(group, elapsed)
+                if options['mix']:
+                    report['total'] = summary(
+                        [result for _, result in results], elapsed)
+        return report
+
+    def run_in_process(self, base_url, options):
+        """
+        Сравнивает цепочки middleware без сети: каждый путь проходит
+        через полный WSGIHandler и через APIWSGIHandler по очереди.
+        """
+        headers = {'HTTP_HOST': urlsplit(base_url).netloc}
+        if options['token']:
+            headers['HTTP_AUTHORIZATION'] = f'Token {options["token"]}'
+        factory = RequestFactory()
+        handlers = (('full', WSGIHandler()), ('api', APIWSGIHandler()))
+        report = {}
+        for path in options['paths'] or DEFAULT_PATHS:
+            path = path.format(recipe=options['recipe'])
+            for name, handler in handlers:
+                results = []
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    request = factory.get(path, **headers)
+                    request_started = time.perf_counter()
+                    response = handler.get_response(request)
+                    response.close()
+                    results.append((
+                        time.perf_counter() - request_started,
+                        response.status_code))
+                report[f'{path} [{name}]'] = summary(
+                    results, time.perf_counter() - started)
+        return report
+
+    def print_report(self, report, compare):
+        """Печатает сводку и изменение p50/p99 к прошлому запуску."""
+        previous = {}
+        if compare:
+            with open(compare) as file:
+                previous = json.load(file)['results']
+        for name, stats in report.items():
+            line = (
+                f'{name}: {stats["rps"]} req/s, p50 {stats["p50"]} ms, '
+                f'p99 {stats["p99"]} ms, errors {stats["errors"]}'
+            )
+            if name in previous:
+                line += ' ({:+.1f}% p50, {:+.1f}% p99)'.format(*(
+                    (stats[key] / previous[name][key] - 1) * 100
+                    if previous[name][key] else 0.0
+                    for key in ('p50', 'p99')
+                ))
+            self.stdout.write(line)
+
+    def mix_jobs(self, base_url, options):
+        """Запросы смешанной нагрузки, воспроизводимые по --seed."""
+        rng = random.Random(options['seed'])
+        users = list(CustomUser.objects.filter(
+            is_in_shopping_cart__isnull=False
+        ).distinct().order_by('id')[:options['users']])
+        recipes = list(Recipe.objects.order_by(
+            '-favorites_count').values_list('id', flat=True)[:1000])
+        names = list(Ingredients.objects.values_list('name', flat=True))
+        if not users or not recipes or not names:
+            raise CommandError(
+                'The database has no data to replay: generate_data')
+        tokens = [
+            {'Authorization': 'Token {}'.format(
+                Token.objects.get_or_create(user=user)[0].key)}
+            for user in users
+        ]
+        pages = max(1, Recipe.objects.count() // PAGE_SIZE)
+        urls = {
+            'recipes-list': lambda: '/api/recipes/',
+            'recipes-list-page': lambda: (
+                f'/api/recipes/?page={rng.randint(1, min(pages, 50))}'),
+            'recipes-detail': lambda: '/api/recipes/{}/'.format(
+                rng.choice(recipes[:rng.choice((10, 1000))])),
+            'ingredients-search': lambda: '/api/ingredients/?name={}'.format(
+                quote(rng.choice(names)[:rng.randint(1, 3)])),
+            'users-subscriptions': lambda: '/api/users/subscriptions/',
+            'download-shopping-cart': lambda: (
+                '/api/recipes/download_shopping_cart/'),
+        }
+        names_mix, weights = zip(*MIX)
+        return [
+            (name, base_url + urls[name](), rng.choice(tokens))
+            for name in rng.choices(
+                names_mix, weights=weights, k=options['requests'])
+        ]
@@ -0,0 +1,210 @@
+import io
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.counters import recount
+from api.feed import rebuild_feeds
+from api.reference import bump_version
+from api.search import index_recipes
+from api.shopping_cart import rebuild_shopping_lists
+from food.models import Ingredients, Recipe, RecipeIngredients, Tag
+from food.renditions import make_renditions
+from users.models import CustomUser
+
+IMAGE_NAME = 'food/synthetic.png'
+WORDS = (
+    'суп', 'салат', 'пирог', 'рагу', 'каша', 'запеканка', 'омлет',
+    'паста', 'плов', 'борщ', 'блины', 'котлеты', 'соус', 'десерт',
+    'овощной', 'куриный', 'грибной', 'сырный', 'острый', 'домашний',
+)
+
+
+def skewed_weights(size, skew):
+    """Накопленные веса по закону Ципфа: первые объекты популярнее."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(size)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generating a reproducible synthetic dataset: users, recipes, '
+        'ingredients, favorites, carts and subscriptions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=5,
+            help='Recipe-ingredient rows = recipes * this',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=10,
+            help='Favorites per user (average)',
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=3,
+            help='Cart recipes per user (average)',
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=5,
+            help='Subscriptions per user (average)',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of recipe and author popularity',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Prefix of generated usernames and recipe names',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        if CustomUser.objects.filter(
+                username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Data with prefix "{self.prefix}" already exists')
+        ingredients = list(Ingredients.objects.values_list('id', flat=True))
+        tags = list(Tag.objects.values_list('id', flat=True))
+        if len(ingredients) < options['ingredients_per_recipe'] or not tags:
+            raise CommandError('Load ingredients and tags first: load_data')
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(users, tags, options)
+            self.create_recipe_ingredients(recipes, ingredients, options)
+            self.create_links(
+                Recipe.is_favorited.through, 'customuser', 'recipe',
+                users, recipes, options['favorites'], options['skew'])
+            self.create_links(
+                Recipe.is_in_shopping_cart.through, 'customuser', 'recipe',
+                users, recipes, options['cart'], options['skew'])
+            self.create_links(
+                CustomUser.is_subscribed.through,
+                'from_customuser', 'to_customuser',
+                users, users, options['subscriptions'], options['skew'])
+            self.stdout.write('Recounting derived data...')
+            recount(fix=True)
+            rebuild_shopping_lists(fix=True)
+            rebuild_feeds()
+            index_recipes(Recipe.objects.filter(
+                name__startswith=f'{self.prefix} '))
+            transaction.on_commit(bump_version)
+        make_renditions(IMAGE_NAME)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated in {time.monotonic() - started:.1f}s'))
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_users(self, count):
+        password = make_password('password')
+        self.bulk_create(CustomUser, (
+            CustomUser(
+                username=f'{self.prefix}{number}',
+                email=f'{self.prefix}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        users = list(CustomUser.objects.filter(
+            username__startswith=self.prefix).order_by('id').values_list(
+            'id', flat=True))
+        self.stdout.write(f'Users: {len(users)}')
+        return users
+
+    def create_recipes(self, users, tags, options):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), (200, 120, 60)).save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        authors = self.rng.choices(
+            users,
+            cum_weights=skewed_weights(len(users), options['skew']),
+            k=options['recipes'],
+        )
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=author,
+                name=f'{self.prefix} {number} '
+                     + ' '.join(self.rng.sample(WORDS, 2)),
+                text=' '.join(self.rng.choices(WORDS, k=30)),
+                image=IMAGE_NAME,
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for number, author in enumerate(authors)
+        ))
+        recipes = list(Recipe.objects.filter(
+            name__startswith=f'{self.prefix} ').order_by('id').values_list(
+            'id', flat=True))
+        RecipeTags = Recipe.tags.through
+        self.bulk_create(RecipeTags, (
+            RecipeTags(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.rng.sample(tags, self.rng.randint(1, len(tags)))
+        ))
+        self.stdout.write(f'Recipes: {len(recipes)}')
+        return recipes
+
+    def create_recipe_ingredients(self, recipes, ingredients, options):
+        per_recipe = options['ingredients_per_recipe']
+        self.bulk_create(RecipeIngredients, (
+            RecipeIngredients(
+                recipe_id=recipe,
+                ingredients_id=ingredient,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in self.rng.sample(ingredients, per_recipe)
+        ))
+        self.stdout.write(
+            f'Recipe ingredients: {len(recipes) * per_recipe}')
+
+    def create_links(self, through, user_field, obj_field, users, objects,
+                     average, skew):
+        """Связи пользователей с популярными объектами, без повторов."""
+        weights = skewed_weights(len(objects), skew)
+        count = 0
+        links = []
+        for user in users:
+            chosen = set(self.rng.choices(
+                objects, cum_weights=weights,
+                k=self.rng.randint(0, average * 2)))
+            if through is CustomUser.is_subscribed.through:
+                chosen.discard(user)
+            count += len(chosen)
+            links.extend(
+                through(**{
+                    f'{user_field}_id': user, f'{obj_field}_id': obj})
+                for obj in sorted(chosen)
+            )
+            if len(links) >= self.batch_size:
+                self.bulk_create(through, links)
+                links = []
+        self.bulk_create(through, links)
+        self.stdout.write(f'{through._meta.db_table}: {count}')
@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.reference import bump_version
+from food.models import Ingredients, Tag
+from foodgram.settings import BASE_DIR
+
+FIELDS = {
+    'ingredients': ('name', 'measurement_unit'),
+    'tags': ('name', 'color', 'slug'),
+}
+FORMATS = ('csv', 'json', 'ndjson')
+
+
+def read_csv(file, fields):
+    """Строки csv без заголовка или с заголовком из названий полей."""
+    for row in csv.reader(file):
+        if not row or tuple(row) == fields:
+            continue
+        yield dict(zip(fields, row))
+
+
+def read_json(file, fields):
+    """Объекты из json-массива."""
+    for item in json.load(file):
+        yield {field: item[field] for field in fields}
+
+
+def read_ndjson(file, fields):
+    """Объекты json, по одному в строке."""
+    for line in file:
+        if line.strip():
+            item = json.loads(line)
+            yield {field: item[field] for field in fields}
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+    'ndjson': read_ndjson,
+}
+
+
+def batches(rows, size):
+    """Разбивает поток строк на пачки по size."""
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def unique_tags(batch):
+    """
+    Оставляет по одной строке на slug и на название (первую),
+    возвращает их и названия отброшенных строк-дублей.
+    """
+    rows, slugs, names, skipped = [], set(), set(), []
+    for row in batch:
+        if row['slug'] in slugs or row['name'] in names:
+            skipped.append(row['name'])
+            continue
+        slugs.add(row['slug'])
+        names.add(row['name'])
+        rows.append(row)
+    return rows, skipped
+
+
+def copy_rows(cursor, table, fields, batch):
+    """
+    Загружает пачку через COPY во временную таблицу
+    со структурой table (PostgreSQL), возвращает её имя.
+    Имя уникально, чтобы несколько загрузок в одной внешней
+    транзакции не конфликтовали.
+    """
+    temp_table = f'load_{table}_{uuid.uuid4().hex[:12]}'
+    columns = ', '.join(fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([row[field] for field in fields])
+    buffer.seek(0)
+    cursor.execute(
+        f'CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS '
+        f'SELECT {columns} FROM {table} WITH NO DATA'
+    )
+    cursor.copy_expert(
+        f'COPY {temp_table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+    return temp_table
+
+
+def upsert_ingredients_postgresql(batch):
+    """
+    Добавляет новые ингредиенты через COPY и INSERT ... ON CONFLICT
+    по уникальной паре (name, measurement_unit).
+    """
+    table = Ingredients._meta.db_table
+    with connection.cursor() as cursor:
+        temp_table = copy_rows(cursor, table, FIELDS['ingredients'], batch)
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            f'SELECT DISTINCT name, measurement_unit FROM {temp_table} '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+        written = cursor.rowcount
+        cursor.execute(f'DROP TABLE {temp_table}')
+    return written, []
+
+
+def upsert_tags_postgresql(batch):
+    """
+    Добавляет и обновляет тэги по slug через COPY и INSERT ... ON
+    CONFLICT; строки с названием чужого тэга пропускаются.
+    """
+    table = Tag._meta.db_table
+    rows, skipped = unique_tags(batch)
+    with connection.cursor() as cursor:
+        temp_table = copy_rows(cursor, table, FIELDS['tags'], rows)
+        cursor.execute(
+            f'SELECT new.name FROM {temp_table} new JOIN {table} old '
+            'ON old.name = new.name AND old.slug <> new.slug'
+        )
+        skipped.extend(name for name, in cursor.fetchall())
+        cursor.execute(
+            f'INSERT INTO {table} (name, color, slug) '
+            f'SELECT name, color, slug FROM {temp_table} new '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {table} old '
+            'WHERE old.name = new.name AND old.slug <> new.slug) '
+            'ON CONFLICT (slug) DO UPDATE '
+            'SET name = EXCLUDED.name, color = EXCLUDED.color'
+        )
+        written = cursor.rowcount
+        cursor.execute(f'DROP TABLE {temp_table}')
+    return written, skipped
+
+
+def upsert_ingredients(batch):
+    """Добавляет ингредиенты, которых ещё нет с таким же названием и мерой."""
+    keys = {(row['name'], row['measurement_unit']) for row in batch}
+    existing = set(Ingredients.objects.filter(
+        name__in={name for name, measurement_unit in keys}
+    ).values_list('name', 'measurement_unit'))
+    created = Ingredients.objects.bulk_create([
+        Ingredients(name=name, measurement_unit=measurement_unit)
+        for name, measurement_unit in keys - existing
+    ], ignore_conflicts=True)
+    return len(created), []
+
+
+def upsert_tags(batch):
+    """
+    Добавляет новые тэги и обновляет существующие по slug;
+    строки с названием чужого тэга пропускаются.
+    """
+    rows, skipped = unique_tags(batch)
+    taken = dict(Tag.objects.filter(
+        name__in=[row['name'] for row in rows]).values_list('name', 'slug'))
+    accepted = {}
+    for row in rows:
+        if taken.get(row['name'], row['slug']) != row['slug']:
+            skipped.append(row['name'])
+        else:
+            accepted[row['slug']] = row
+    rows = accepted
+    existing = Tag.objects.in_bulk(rows, field_name='slug')
+    for slug, tag in existing.items():
+        tag.name, tag.color = rows[slug]['name'], rows[slug]['color']
+    Tag.objects.bulk_update(existing.values(), ('name', 'color'))
+    Tag.objects.bulk_create(
+        Tag(**row) for slug, row in rows.items() if slug not in existing
+    )
+    return len(rows), skipped
+
+
+UPSERTS = {
+    ('ingredients', 'postgresql'): upsert_ingredients_postgresql,
+    ('tags', 'postgresql'): upsert_tags_postgresql,
+    ('ingredients', None): upsert_ingredients,
+    ('tags', None): upsert_tags,
+}
+
+
+class Command(BaseCommand):
+    help = 'Loading ingredients or tags from csv, json or ndjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=[os.path.join(BASE_DIR, 'data', 'ingredients.csv')],
+        )
+        parser.add_argument(
+            '--model',
+            choices=tuple(FIELDS),
+            default='ingredients',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format, by default taken from the file extension',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        model = options['model']
+        upsert = UPSERTS.get(
+            (model, connection.vendor), UPSERTS[(model, None)])
+        started = time.monotonic()
+        total = changed = 0
+        skipped = []
+        for path in options['paths']:
+            file_format = (options['format']
+                           or os.path.splitext(path)[1].lstrip('.').lower())
+            if file_format not in READERS:
+                raise CommandError(f'Unknown format of {path}')
+            with open(path, encoding='utf-8') as file:
+                rows = READERS[file_format](file, FIELDS[model])
+                for batch in batches(rows, options['batch_size']):
+                    with transaction.atomic():
+                        written, batch_skipped = upsert(batch)
+                    changed += written
+                    skipped.extend(batch_skipped)
+                    total += len(batch)
+                    elapsed = max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(
+                        f'{model}: {total} rows, '
+                        f'{total / elapsed:.0f} rows/s'
+                    )
+        bump_version()
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                'Skipped, the name belongs to another tag or repeats: '
+                + ', '.join(skipped)
+            ))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loading is complete! {model}: read {total}, '
+            f'written {changed} in {elapsed:.2f}s'
+        ))
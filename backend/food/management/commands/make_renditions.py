@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from food.models import Recipe
+from food.renditions import make_renditions
+
+
+class Command(BaseCommand):
+    help = 'Creating image renditions for existing recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Recreate renditions that already exist',
+        )
+
+    def handle(self, *args, **options):
+        created = failed = 0
+        images = Recipe.objects.exclude(image='').values_list(
+            'image', flat=True)
+        for image_name in images.iterator():
+            try:
+                created += make_renditions(
+                    image_name, overwrite=options['overwrite'])
+            except Exception as error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'{image_name}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Renditions created: {created}, failed images: {failed}'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import PROFILE_HEADER, make_token
+from foodgram.settings import PROFILE_DIR, PROFILE_TOKEN_MAX_AGE
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Issuing a signed token that profiles requests of a staff user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True)
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.filter(
+            email=options['email'], is_staff=True).first()
+        if user is None:
+            raise CommandError(f'No staff user {options["email"]}')
+        token = make_token(user)
+        self.stdout.write(token)
+        self.stdout.write(
+            f'Valid for {PROFILE_TOKEN_MAX_AGE} s. Send it in the '
+            f'{PROFILE_HEADER} header or ?profile= parameter; '
+            f'profiles are saved to {PROFILE_DIR}'
+        )
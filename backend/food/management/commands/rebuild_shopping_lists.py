@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_cart import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Checking and repairing stored shopping lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift, do not fix it',
+        )
+
+    def handle(self, *args, **options):
+        drifted = rebuild_shopping_lists(fix=not options['check'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Shopping lists are in sync'))
+        elif options['check']:
+            self.stdout.write(self.style.ERROR(
+                f'Shopping lists drifted: {drifted} rows'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Shopping lists repaired: {drifted} rows'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Recomputing stored favorites, cart and subscription counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift, do not fix it',
+        )
+
+    def handle(self, *args, **options):
+        drifted = recount(fix=not options['check'])
+        for field, rows in drifted.items():
+            if not rows:
+                self.stdout.write(self.style.SUCCESS(f'{field}: in sync'))
+            elif options['check']:
+                self.stdout.write(self.style.ERROR(
+                    f'{field}: drifted in {rows} rows'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{field}: repaired {rows} rows'))
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.13 on 2026-10-18 18:09
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+import food.models
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е')
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Recipe = apps.get_model('food', 'Recipe')
+        Recipe.objects.update(search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector('text', weight='B', config='russian')
+        ))
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE food_recipe_fts '
+            "USING fts5(name, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        Recipe = apps.get_model('food', 'Recipe')
+        for pk, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text').iterator():
+            schema_editor.execute(
+                'INSERT INTO food_recipe_fts (rowid, name, text) '
+                'VALUES (%s, %s, %s)',
+                (pk, normalize(name), normalize(text))
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS food_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=food.models.SearchVectorIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+        ),
+    ]
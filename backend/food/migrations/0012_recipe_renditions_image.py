@@ -0,0 +1,39 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:20
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+from foodgram.settings import RECIPE_IMAGE_RENDITIONS
+
+
+def mark_existing_renditions(apps, schema_editor):
+    """Отмечает рецепты, копии картинок которых уже лежат в хранилище."""
+    from food.renditions import rendition_name
+
+    Recipe = apps.get_model('food', 'Recipe')
+    images = Recipe.objects.exclude(image='').values_list(
+        'image', flat=True).distinct()
+    for image_name in images.iterator():
+        if all(
+            default_storage.exists(rendition_name(image_name, rendition))
+            for rendition in RECIPE_IMAGE_RENDITIONS
+        ):
+            Recipe.objects.filter(image=image_name).update(
+                renditions_image=image_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0010_shoppinglist_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_image',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка, для которой созданы копии'),
+        ),
+        migrations.RunPython(
+            mark_existing_renditions, migrations.RunPython.noop),
+    ]
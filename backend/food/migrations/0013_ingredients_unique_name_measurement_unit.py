@@ -0,0 +1,55 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_rows(model, owner, keep, duplicates):
+    """Переносит строки дублей на оставляемый ингредиент, складывая amount."""
+    for row in model.objects.filter(ingredients_id__in=duplicates):
+        target, created = model.objects.get_or_create(
+            ingredients_id=keep,
+            defaults={'amount': row.amount},
+            **{owner: getattr(row, owner)},
+        )
+        if not created:
+            target.amount += row.amount
+            target.save(update_fields=['amount'])
+        row.delete()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Оставляет по одному ингредиенту с одинаковыми названием и мерой
+    (с наименьшим id), ссылки дублей переносит на него.
+    """
+    Ingredients = apps.get_model('food', 'Ingredients')
+    RecipeIngredients = apps.get_model('food', 'RecipeIngredients')
+    ShoppingList = apps.get_model('food', 'ShoppingList')
+    groups = Ingredients.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), count=Count('id')).filter(count__gt=1)
+    for group in list(groups):
+        duplicates = list(Ingredients.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep']).values_list('id', flat=True))
+        merge_rows(RecipeIngredients, 'recipe_id', group['keep'], duplicates)
+        merge_rows(ShoppingList, 'user_id', group['keep'], duplicates)
+        Ingredients.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0012_recipe_renditions_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_measurement_unit'),
+        ),
+    ]
@@ -1,6 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from users.models import CustomUser
+from users.models import CountersMixin, CustomUser
 
 CHOICES = (
     ('кг', 'kg'),
@@ -11,6 +13,19 @@ CHOICES = (
 )
 
 
+class SearchVectorIndex(GinIndex):
+    """
+    GIN-индекс поискового вектора на PostgreSQL. На других СУБД поле
+    не заполняется (поиск идёт через FTS5), там создаётся обычный индекс.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().create_sql(model, schema_editor, **kwargs)
+        return models.Index.create_sql(
+            self, model, schema_editor, using=using, **kwargs)
+
+
 class Tag(models.Model):
     """Модель тэгов."""
     name = models.CharField(
@@ -54,12 +69,18 @@ class Ingredients(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name', )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit',),
+                name='unique_ingredient_name_measurement_unit',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name} {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """Модель рецептов."""
     author = models.ForeignKey(
         CustomUser,
@@ -79,6 +100,12 @@ class Recipe(models.Model):
         verbose_name='Картинка',
         upload_to='food/'
     )
+    renditions_image = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Картинка, для которой созданы копии',
+    )
     is_favorited = models.ManyToManyField(
         CustomUser,
         verbose_name='Понравившиеся рецепты',
@@ -111,6 +138,28 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
+    favorites_count = models.IntegerField(
+        verbose_name='Общее число в избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.IntegerField(
+        verbose_name='Общее число в списках покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -122,6 +171,12 @@ class Recipe(models.Model):
                 name='unique_author_name'
             ),
         )
+        indexes = (
+            SearchVectorIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_gin',
+            ),
+        )
 
     def __str__(self):
         return f'{self.author}, {self.name}'
@@ -159,3 +214,80 @@ class RecipeIngredients(models.Model):
 
     def __str__(self):
         return f'{self.amount} {self.ingredients}'
+
+
+class ShoppingList(models.Model):
+    """Сводный список покупок пользователя, обновляется инкрементально."""
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredients = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+
+    class Meta:
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ('user', )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredients',),
+                name='unique_user_shopping_list',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.amount} {self.ingredients}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, создаётся при публикации рецепта автором."""
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('user', '-pub_date')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe',),
+                name='unique_user_feed_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
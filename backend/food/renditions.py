@@ -0,0 +1,97 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from food.models import Recipe
+from foodgram.settings import (RECIPE_IMAGE_RENDITION_WORKERS,
+                               RECIPE_IMAGE_RENDITIONS)
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'food/renditions'
+
+executor = ThreadPoolExecutor(
+    max_workers=RECIPE_IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions',
+)
+
+
+def rendition_name(image_name, rendition):
+    """Путь к уменьшенной копии картинки в хранилище."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.webp'
+
+
+def rendition_urls(image_name, ready):
+    """
+    Ссылки на уменьшенные копии картинки; пока копии ещё не созданы
+    в фоне, вместо них отдаётся ссылка на оригинал.
+    """
+    return {
+        rendition: default_storage.url(
+            rendition_name(image_name, rendition) if ready else image_name)
+        for rendition in RECIPE_IMAGE_RENDITIONS
+    }
+
+
+def mark_renditions_ready(image_name):
+    """Отмечает у рецептов с этой картинкой, что копии уже созданы."""
+    return Recipe.objects.filter(image=image_name).exclude(
+        renditions_image=image_name).update(renditions_image=image_name)
+
+
+def make_renditions(image_name, overwrite=False):
+    """
+    Создаёт уменьшенные копии картинки в формате WebP и отмечает это
+    у рецептов, возвращает число созданных файлов.
+    """
+    missing = {
+        rendition: size
+        for rendition, size in RECIPE_IMAGE_RENDITIONS.items()
+        if overwrite or not default_storage.exists(
+            rendition_name(image_name, rendition))
+    }
+    if not missing:
+        mark_renditions_ready(image_name)
+        return 0
+    with default_storage.open(image_name) as file, Image.open(file) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands()
+                                  else 'RGB')
+        for rendition, size in missing.items():
+            copy = image.copy()
+            copy.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            copy.save(buffer, format='WEBP', quality=80, method=4)
+            name = rendition_name(image_name, rendition)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    mark_renditions_ready(image_name)
+    return len(missing)
+
+
+def delete_renditions(image_name):
+    """Удаляет уменьшенные копии картинки из хранилища."""
+    for rendition in RECIPE_IMAGE_RENDITIONS:
+        name = rendition_name(image_name, rendition)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def _make_renditions_logged(image_name):
+    try:
+        make_renditions(image_name)
+    except Exception:
+        logger.exception('Не удалось создать копии картинки %s', image_name)
+
+
+def schedule_renditions(image_name):
+    """Создаёт уменьшенные копии в пуле потоков, не блокируя запрос."""
+    return executor.submit(_make_renditions_logged, image_name)
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+
+from api.tests.base import TEST_CACHES
+from food.management.commands.load_data import UPSERTS
+from food.models import Ingredients, Tag
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LoadDataTest(TestCase):
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.ingredients = self.write(
+            'ingredients.csv', 'соль,г\nсахар,г\nсоль,г\nмолоко,мл\n')
+        self.tags = self.write('tags.json', json.dumps([
+            {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+            {'name': 'Обед', 'color': '#49B64E', 'slug': 'lunch'},
+        ]))
+
+    def load(self, *args):
+        output = StringIO()
+        call_command('load_data', *args, stdout=output)
+        return output.getvalue()
+
+    def test_ingredients_are_idempotent(self):
+        self.load(self.ingredients, '--batch-size', '2')
+        self.load(self.ingredients)
+        self.assertEqual(Ingredients.objects.count(), 3)
+
+    def test_tags_upsert_by_slug(self):
+        self.load(self.tags, '--model', 'tags')
+        path = self.write('tags.ndjson', json.dumps(
+            {'name': 'Ранний завтрак', 'color': '#000000',
+             'slug': 'breakfast'}, ensure_ascii=False))
+        self.load(path, '--model', 'tags')
+        tag = Tag.objects.get(slug='breakfast')
+        self.assertEqual((tag.name, tag.color), ('Ранний завтрак', '#000000'))
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_tag_name_of_another_slug_is_skipped(self):
+        self.load(self.tags, '--model', 'tags')
+        path = self.write('conflict.json', json.dumps([
+            {'name': 'Обед', 'color': '#111111', 'slug': 'dinner'},
+            {'name': 'Обед', 'color': '#222222', 'slug': 'breakfast'},
+            {'name': 'Ужин', 'color': '#333333', 'slug': 'supper'},
+            {'name': 'Ужин', 'color': '#444444', 'slug': 'evening'},
+        ]))
+        output = self.load(path, '--model', 'tags')
+        self.assertIn('Skipped', output)
+        self.assertEqual(
+            set(Tag.objects.values_list('slug', 'name')),
+            {('breakfast', 'Завтрак'), ('lunch', 'Обед'),
+             ('supper', 'Ужин')}
+        )
+
+    def test_two_loads_in_one_transaction(self):
+        with transaction.atomic():
+            self.load(self.ingredients)
+            self.load(self.tags, '--model', 'tags')
+        self.assertEqual(Ingredients.objects.count(), 3)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_load_csv_alias(self):
+        output = StringIO()
+        call_command('load_csv', stdout=output)
+        self.assertIn('Loading is complete', output.getvalue())
+        self.assertTrue(Ingredients.objects.exists())
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_copy_path(self):
+        self.assertIs(
+            UPSERTS[('ingredients', connection.vendor)],
+            UPSERTS[('ingredients', 'postgresql')]
+        )
+        self.load(self.ingredients, '--batch-size', '2')
+        self.load(self.tags, '--model', 'tags')
+        with transaction.atomic():
+            self.load(self.ingredients)
+            self.load(self.ingredients)
+        self.assertEqual(Ingredients.objects.count(), 3)
+        self.assertEqual(
+            set(Tag.objects.values_list('slug', flat=True)),
+            {'breakfast', 'lunch'}
+        )
+
+    def test_ingredient_name_and_unit_are_unique(self):
+        Ingredients.objects.create(name='соль', measurement_unit='г')
+        Ingredients.objects.create(name='соль', measurement_unit='кг')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Ingredients.objects.create(name='соль', measurement_unit='г')
+        self.load(self.ingredients)
+        self.assertEqual(Ingredients.objects.count(), 4)
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [('food', '0012_recipe_renditions_image')]
+AFTER = [('food', '0013_ingredients_unique_name_measurement_unit')]
+
+
+class MergeDuplicateIngredientsTest(TransactionTestCase):
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged(self):
+        apps = self.migrate(BEFORE)
+        Ingredients = apps.get_model('food', 'Ingredients')
+        Recipe = apps.get_model('food', 'Recipe')
+        RecipeIngredients = apps.get_model('food', 'RecipeIngredients')
+        ShoppingList = apps.get_model('food', 'ShoppingList')
+        CustomUser = apps.get_model('users', 'CustomUser')
+        user = CustomUser.objects.create(
+            username='user', email='user@example.com')
+        salt, copy, sugar = (
+            Ingredients.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'соль', 'сахар')
+        )
+        first, second = (
+            Recipe.objects.create(
+                author=user, name=name, text='Описание', image='food/x.png')
+            for name in ('Первый', 'Второй')
+        )
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe=first, ingredients=salt, amount=1),
+            RecipeIngredients(recipe=first, ingredients=copy, amount=2),
+            RecipeIngredients(recipe=second, ingredients=copy, amount=3),
+            RecipeIngredients(recipe=second, ingredients=sugar, amount=4),
+        ])
+        ShoppingList.objects.bulk_create([
+            ShoppingList(user=user, ingredients=salt, amount=1),
+            ShoppingList(user=user, ingredients=copy, amount=5),
+        ])
+
+        apps = self.migrate(AFTER)
+        Ingredients = apps.get_model('food', 'Ingredients')
+        RecipeIngredients = apps.get_model('food', 'RecipeIngredients')
+        ShoppingList = apps.get_model('food', 'ShoppingList')
+        self.assertEqual(
+            sorted(Ingredients.objects.values_list('id', 'name')),
+            [(salt.id, 'соль'), (sugar.id, 'сахар')]
+        )
+        self.assertEqual(
+            set(RecipeIngredients.objects.values_list(
+                'recipe_id', 'ingredients_id', 'amount')),
+            {(first.id, salt.id, 3), (second.id, salt.id, 3),
+             (second.id, sugar.id, 4)}
+        )
+        self.assertEqual(
+            list(ShoppingList.objects.values_list(
+                'ingredients_id', 'amount')),
+            [(salt.id, 6)]
+        )
@@ -0,0 +1,12 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASGI_MODE', 'True')
+
+application = get_asgi_application()
+
+from foodgram.handlers import APIASGIHandler, asgi_dispatch  # noqa: E402
+
+application = asgi_dispatch(application, APIASGIHandler())
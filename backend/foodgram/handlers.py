@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+from foodgram.settings import API_MIDDLEWARE, API_PREFIX
+
+
+class APIHandlerMixin:
+    """
+    Обработчик с цепочкой API_MIDDLEWARE вместо MIDDLEWARE: API
+    аутентифицируется токеном, сессии, CSRF и сообщения ему не нужны.
+    Цепочка собирается так же, как в BaseHandler.load_middleware,
+    но из своего списка, без подмены глобальных settings.
+    """
+    middleware = API_MIDDLEWARE
+
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        handler = convert_exception_to_response(
+            self._get_response_async if is_async else self._get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(self.middleware):
+            wrapped = self.wrap(
+                middleware_path, handler, handler_is_async, is_async)
+            if wrapped is not None:
+                handler, handler_is_async = wrapped
+        self._middleware_chain = self.adapt_method_mode(
+            is_async, handler, handler_is_async)
+
+    def wrap(self, middleware_path, handler, handler_is_async, is_async):
+        """
+        Оборачивает handler в middleware: (новый handler, асинхронный ли он)
+        или None, если middleware отказался работать (MiddlewareNotUsed).
+        """
+        middleware = import_string(middleware_path)
+        can_sync = getattr(middleware, 'sync_capable', True)
+        can_async = getattr(middleware, 'async_capable', False)
+        if not can_sync and not can_async:
+            raise ImproperlyConfigured(
+                f'Middleware {middleware_path} must have at least one of '
+                'sync_capable/async_capable set to True.')
+        middleware_is_async = can_async and (handler_is_async or not can_sync)
+        adapted = self.adapt_method_mode(
+            middleware_is_async, handler, handler_is_async,
+            debug=settings.DEBUG, name=f'middleware {middleware_path}')
+        try:
+            instance = middleware(adapted)
+        except MiddlewareNotUsed:
+            return None
+        if instance is None:
+            raise ImproperlyConfigured(
+                f'Middleware factory {middleware_path} returned None.')
+        if hasattr(instance, 'process_view'):
+            self._view_middleware.insert(
+                0, self.adapt_method_mode(is_async, instance.process_view))
+        if hasattr(instance, 'process_template_response'):
+            self._template_response_middleware.append(self.adapt_method_mode(
+                is_async, instance.process_template_response))
+        if hasattr(instance, 'process_exception'):
+            self._exception_middleware.append(self.adapt_method_mode(
+                False, instance.process_exception))
+        return convert_exception_to_response(instance), middleware_is_async
+
+
+class APIWSGIHandler(APIHandlerMixin, WSGIHandler):
+    pass
+
+
+class APIASGIHandler(APIHandlerMixin, ASGIHandler):
+    pass
+
+
+def is_api(path):
+    return path.startswith(API_PREFIX)
+
+
+def wsgi_dispatch(site, api):
+    """WSGI-приложение: /api/ — короткая цепочка, остальное — полная."""
+    def application(environ, start_response):
+        if is_api(environ.get('PATH_INFO', '')):
+            return api(environ, start_response)
+        return site(environ, start_response)
+    return application
+
+
+def asgi_dispatch(site, api):
+    """ASGI-приложение: /api/ — короткая цепочка, остальное — полная."""
+    async def application(scope, receive, send):
+        path = scope.get('path', '')
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if scope['type'] == 'http' and is_api(path):
+            return await api(scope, receive, send)
+        return await site(scope, receive, send)
+    return application
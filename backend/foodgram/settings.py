@@ -18,15 +18,110 @@ DEBUG = False
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS',
                           default='localhost 127.0.0.1').split(' ')
 
+JWT_AUTH = os.getenv('JWT_AUTH', default='False') == 'True'
+
+ASGI_MODE = os.getenv('ASGI_MODE', default='False') == 'True'
+
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', default=8))
+
+NPLUSONE_SAMPLE_RATE = float(os.getenv('NPLUSONE_SAMPLE_RATE', default=0))
+
+NPLUSONE_STRICT = os.getenv('NPLUSONE_STRICT', default='False') == 'True'
+
+PROFILE_SAMPLE_EVERY = int(os.getenv('PROFILE_SAMPLE_EVERY', default=0))
+
+PROFILE_DIR = os.getenv('PROFILE_DIR',
+                        default=os.path.join(BASE_DIR, 'profiles'))
+
+INGREDIENTS_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENTS_SEARCH_LIMIT', default=50))
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=5 * 1024 * 1024))
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2621440))
+
+BULK_IDS_MAX = int(os.getenv('BULK_IDS_MAX', default=100))
+
+RECIPE_IMAGE_RENDITIONS = {
+    'small': (320, 320),
+    'medium': (640, 640),
+}
+
+RECIPE_IMAGE_RENDITION_WORKERS = int(
+    os.getenv('RECIPE_IMAGE_RENDITION_WORKERS', default=2))
+
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default=1000))
+
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', default=50))
+
+REFERENCE_VERSION_CHECK_INTERVAL = float(
+    os.getenv('REFERENCE_VERSION_CHECK_INTERVAL', default=1))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=1024))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+
+# Отметки токенов всех процессов и метрики лежат в кэше 'reference',
+# поэтому его размер берётся с большим запасом над TOKEN_CACHE_SIZE:
+# иначе FileBasedCache вытесняет отметки и токены перепроверяются в БД.
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv(
+    'REFERENCE_CACHE_MAX_ENTRIES', default=TOKEN_CACHE_SIZE * 20))
+
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', default=5))
+
+METRICS_WORKER_TTL = int(os.getenv('METRICS_WORKER_TTL', default=300))
+
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+PROFILE_TOKEN_MAX_AGE = int(
+    os.getenv('PROFILE_TOKEN_MAX_AGE', default=60 * 60))
+
+PROFILE_SAMPLER_INTERVAL = float(
+    os.getenv('PROFILE_SAMPLER_INTERVAL', default=0.001))
+
+PROFILE_TOP_ALLOCATIONS = int(
+    os.getenv('PROFILE_TOP_ALLOCATIONS', default=25))
+
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', default=5))
+
+NPLUSONE_STACK_DEPTH = int(os.getenv('NPLUSONE_STACK_DEPTH', default=4))
+
+QUERY_BUDGETS = {
+    'GET recipes-list': 7,
+    'GET recipes-detail': 6,
+    'GET recipes-feed': 8,
+    'GET recipes-download-shopping-cart': 3,
+    'GET ingredients-list': 1,
+    'GET ingredients-detail': 1,
+    'GET tags-list': 1,
+    'GET tags-detail': 1,
+    'GET users-list': 5,
+    'GET users-detail': 3,
+    'GET users-me': 1,
+    'GET users-subscriptions': 5,
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
+if JWT_AUTH:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(
+        0, 'api.authentication.StatelessJWTAuthentication')
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -46,6 +141,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.nplusone.NPlusOneMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +153,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_PREFIX = '/api/'
+
+API_MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.nplusone.NPlusOneMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -75,6 +184,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE'),
@@ -83,9 +194,32 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'TEST': {
+            'NAME': os.getenv('DB_TEST_NAME'),
+        },
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('REFERENCE_CACHE_LOCATION',
+                              default=os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': REFERENCE_CACHE_MAX_ENTRIES},
+    },
+    # Отдельный каталог под версии снимков: ключей в нём единицы,
+    # и ключ версии не вытесняется токенами и метриками.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'VERSIONS_CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache', 'versions')),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME':
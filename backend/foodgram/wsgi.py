@@ -5,3 +5,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+from foodgram.handlers import APIWSGIHandler, wsgi_dispatch  # noqa: E402
+
+application = wsgi_dispatch(application, APIWSGIHandler())
@@ -7,6 +7,7 @@ from users.models import CustomUser
 class MyUserAdmin(UserAdmin):
     list_display = (
         'username', 'first_name', 'last_name', 'email',
+        'recipes_count', 'subscribers_count',
     )
     fields = (
         ('username', 'email', ),
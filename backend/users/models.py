@@ -3,7 +3,27 @@ from django.core.validators import MinLengthValidator
 from django.db import models
 
 
-class CustomUser(AbstractUser):
+class CountersMixin:
+    """
+    Счётчики меняются только атомарно через F() (api.counters), поэтому
+    save() существующего объекта не записывает их значения из памяти.
+    """
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (update_fields is None and not self._state.adding
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class CustomUser(CountersMixin, AbstractUser):
     """Кастомная модель пользователя основанная на AbstractUser."""
     username = models.CharField(
         'Имя пользователя',
@@ -21,9 +41,21 @@ class CustomUser(AbstractUser):
         symmetrical=False,
         blank=True,
     )
+    recipes_count = models.IntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.IntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     objects = UserManager()
 
+    counter_fields = ('recipes_count', 'subscribers_count')
+
     EMAIL_FIELD = 'email'
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
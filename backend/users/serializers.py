@@ -43,6 +43,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Проверка подписки."""
+        if hasattr(obj, 'subscribed'):
+            return obj.subscribed
         user = self.context.get('request').user
         if user.is_anonymous or (user == obj):
             return False
@@ -1,3 +1,9 @@
+from collections import defaultdict
+
+from django.db.models import (BooleanField, Exists, F, OuterRef, Value,
+                              Window)
+from django.db.models.functions import RowNumber
+
 from api.pagination import CustomPagination
 from api.serializers import UserSubscriptionSerializer
 from api.utils import FilterDataset
@@ -6,6 +12,7 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import HTTP_401_UNAUTHORIZED
+from food.models import Recipe
 from users.models import CustomUser
 from users.serializers import UserSerializer
 
@@ -16,6 +23,19 @@ class UserViewSet(viewsets.ModelViewSet, FilterDataset):
     serializer_class = UserSerializer
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        user = self.request.user
+        if user.is_anonymous:
+            subscribed = Value(False, output_field=BooleanField())
+        else:
+            subscribed = Exists(
+                CustomUser.is_subscribed.through.objects.filter(
+                    from_customuser=user.id, to_customuser=OuterRef('pk')))
+        return queryset.annotate(subscribed=subscribed).order_by('id')
+
     def perform_create(self, serializer):
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -48,6 +68,17 @@ class UserViewSet(viewsets.ModelViewSet, FilterDataset):
         """Создаёт/удалет связь между пользователями."""
         return self.obj_favorite_cart_subscribe(request, pk, self.SUBSCRIBE)
 
+    @action(
+        methods=('POST', 'DELETE',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='subscribe',
+        url_name='subscribe-bulk'
+    )
+    def subscribe_bulk(self, request):
+        """Создаёт/удаляет подписки сразу на несколько пользователей."""
+        return self.bulk_favorite_cart_subscribe(request, self.SUBSCRIBE)
+
     @action(
         methods=('GET',),
         detail=False,
@@ -59,13 +90,54 @@ class UserViewSet(viewsets.ModelViewSet, FilterDataset):
         user = self.request.user
         if user.is_anonymous:
             return Response(status=HTTP_401_UNAUTHORIZED)
-        authors = user.is_subscribed.all()
+        authors = user.is_subscribed.annotate(
+            subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
         pages = self.paginate_queryset(authors)
+        recipes_limit = self.get_recipes_limit()
+        self.attach_latest_recipes(pages, recipes_limit)
         serializer = UserSubscriptionSerializer(
-            pages, many=True, context={'request': request}
+            pages,
+            many=True,
+            context={'request': request, 'recipes_limit': recipes_limit}
         )
         return self.get_paginated_response(serializer.data)
 
+    def get_recipes_limit(self):
+        """Значение recipes_limit из запроса, None если не задано."""
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None or not recipes_limit.isdigit():
+            return None
+        return int(recipes_limit)
+
+    @staticmethod
+    def attach_latest_recipes(authors, limit):
+        """
+        Выбирает последние рецепты сразу для всех авторов страницы
+        одним запросом с оконной функцией ROW_NUMBER.
+        """
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit is not None:
+            ranked = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('author')],
+                    order_by=F('pub_date').desc(),
+                )
+            )
+            sql, params = ranked.query.sql_with_params()
+            recipes = Recipe.objects.raw(
+                f'SELECT * FROM ({sql}) AS ranked '
+                'WHERE ranked.row_number <= %s '
+                'ORDER BY ranked.pub_date DESC',
+                (*params, limit)
+            )
+        latest_recipes = defaultdict(list)
+        for recipe in recipes:
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.id]
+
     @action(
         methods=('POST',),
         detail=False,